@@ -0,0 +1,43 @@
+import asyncio
+from typing import Any, Awaitable, Dict, List, Optional, Set
+
+RECIPE_COLUMNS = "id,title,directions,minutes,tags"
+
+background: Set["asyncio.Future"] = set()
+
+def fire_and_forget(coro: Awaitable[Any]) -> "asyncio.Future":
+    task = asyncio.ensure_future(coro)
+    background.add(task)
+
+    def done(t):
+        background.discard(t)
+        if not t.cancelled():
+            t.exception()
+
+    task.add_done_callback(done)
+    return task
+
+async def drain(timeout: float = 5.0):
+    pending = [t for t in background if not t.done()]
+    if pending:
+        await asyncio.wait(pending, timeout=timeout)
+
+async def fetch_recipes(asb, ids: List[str]) -> List[Dict[str, Any]]:
+    if not ids:
+        return []
+    return (await asb.table("recipes").select(RECIPE_COLUMNS).in_("id", ids).execute()).data or []
+
+async def fetch_ingredients(asb, ids: List[str]) -> List[Dict[str, Any]]:
+    if not ids:
+        return []
+    return (await asb.table("recipe_ingredients").select("recipe_id,name").in_("recipe_id", ids).execute()).data or []
+
+def ingredient_page(client, after: Optional[str], size: int):
+    query = client.table("recipe_ingredients").select("id,recipe_id,name").order("id").limit(size)
+    return query.gt("id", after) if after is not None else query
+
+async def fetch_ingredient_page(asb, after: Optional[str], size: int) -> List[Dict[str, Any]]:
+    return (await ingredient_page(asb, after, size).execute()).data or []
+
+async def insert_rows(asb, table: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return (await asb.table(table).insert(rows).execute()).data or []
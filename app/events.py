@@ -0,0 +1,93 @@
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import env_float, env_int
+
+class EventPipeline:
+    def __init__(self, sink: Callable[[List[Dict[str, Any]]], None], max_queue: int = 10000, batch_size: int = 100, interval: float = 2.0, inline: bool = False):
+        self.sink = sink
+        self.inline = inline
+        self.batch_size = batch_size
+        self.interval = interval
+        self.queue: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=max_queue)
+        self.enqueued = 0
+        self.dropped = 0
+        self.flushed = 0
+        self.failed = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._flush_lock = threading.Lock()
+
+    def start(self):
+        if self.inline or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="event-pipeline", daemon=True)
+        self._thread.start()
+
+    def emit(self, row: Dict[str, Any]) -> bool:
+        if self._thread is None and not self.inline:
+            self.start()
+        try:
+            self.queue.put_nowait(row)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    def _drain(self, limit: int) -> List[Dict[str, Any]]:
+        batch = []
+        while len(batch) < limit:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def flush(self):
+        with self._flush_lock:
+            while True:
+                batch = self._drain(self.batch_size)
+                if not batch:
+                    return
+                try:
+                    self.sink(batch)
+                    self.flushed += len(batch)
+                except Exception:
+                    self.failed += len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            deadline = time.monotonic() + self.interval
+            while self.queue.qsize() < self.batch_size and not self._stop.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._stop.wait(min(remaining, 0.05))
+            self.flush()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+        self.flush()
+
+    def pending(self) -> bool:
+        return self.inline and not self.queue.empty()
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self.queue.qsize(), "enqueued": self.enqueued, "flushed": self.flushed, "failed": self.failed, "dropped": self.dropped}
+
+def build_pipeline(sink: Callable[[List[Dict[str, Any]]], None]) -> EventPipeline:
+    return EventPipeline(
+        sink,
+        max_queue=env_int("EVENTS_QUEUE_MAX", 10000),
+        batch_size=env_int("EVENTS_BATCH_SIZE", 100),
+        interval=env_float("EVENTS_FLUSH_INTERVAL", 2.0),
+        inline=os.getenv("EVENTS_INLINE", "true" if os.getenv("VERCEL") else "false").lower() == "true",
+    )
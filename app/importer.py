@@ -0,0 +1,185 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TextIO
+
+from .ingredients import normalize
+
+LIST_SEPARATORS = ("|", ";")
+
+def split_list(value: Any) -> List[str]:
+    if isinstance(value, list):
+        return [str(x) for x in value if x is not None]
+    text = str(value or "")
+    for sep in LIST_SEPARATORS:
+        if sep in text:
+            return [x for x in text.split(sep)]
+    return [text] if text.strip() else []
+
+def to_minutes(value: Any) -> Optional[int]:
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        return None
+
+def clean_record(raw: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    title = str(raw.get("title") or "").strip()
+    names = sorted(set(normalize(split_list(raw.get("ingredients") or raw.get("keys")))))
+    if not title or not names:
+        return None
+    rec = {
+        "title": title,
+        "minutes": to_minutes(raw.get("minutes")),
+        "directions": str(raw.get("directions") or "").strip(),
+        "tags": [t.strip() for t in split_list(raw.get("tags")) if t.strip()],
+    }
+    rec["content_hash"] = content_hash(rec, names)
+    return {"recipe": rec, "ingredients": names}
+
+def content_hash(rec: Dict[str, Any], names: List[str]) -> str:
+    payload = json.dumps([rec["title"].lower(), rec["directions"], names], ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def detect_format(path: str) -> str:
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+def iter_raw(f: TextIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    if fmt == "csv":
+        for row in csv.DictReader(f):
+            yield row
+        return
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield {}
+            continue
+        yield row if isinstance(row, dict) else {}
+
+def chunks(records: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for r in records:
+        batch.append(r)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def read_checkpoint(path: str) -> int:
+    if not path or not os.path.exists(path):
+        return 0
+    try:
+        with open(path) as f:
+            return int(json.load(f).get("records", 0))
+    except (OSError, ValueError):
+        return 0
+
+def write_checkpoint(path: str, records: int):
+    if not path:
+        return
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"records": records}, f)
+    os.replace(tmp, path)
+
+class ImportStats:
+    def __init__(self):
+        self.read = 0
+        self.skipped = 0
+        self.invalid = 0
+        self.duplicates = 0
+        self.recipes = 0
+        self.links = 0
+        self.chunks = 0
+        self.started = time.monotonic()
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        return {
+            "read": self.read,
+            "skipped": self.skipped,
+            "invalid": self.invalid,
+            "duplicates": self.duplicates,
+            "recipes": self.recipes,
+            "links": self.links,
+            "chunks": self.chunks,
+            "seconds": round(elapsed, 2),
+            "recipes_per_second": round(self.recipes / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+
+def write_chunk(sb, batch: List[Dict[str, Any]]) -> int:
+    rows = sb.table("recipes").upsert([b["recipe"] for b in batch], on_conflict="content_hash").execute().data or []
+    ids = {r.get("content_hash"): r.get("id") for r in rows}
+    links = []
+    for b in batch:
+        rid = ids.get(b["recipe"]["content_hash"])
+        if not rid:
+            continue
+        for n in b["ingredients"]:
+            links.append({"recipe_id": rid, "name": n})
+    if links:
+        sb.table("recipe_ingredients").upsert(links, on_conflict="recipe_id,name").execute()
+    return len(links)
+
+def import_stream(sb, f: TextIO, fmt: str = "jsonl", chunk_size: int = 500, checkpoint: str = "", progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    stats = ImportStats()
+    resume_at = read_checkpoint(checkpoint)
+
+    def records():
+        for raw in iter_raw(f, fmt):
+            stats.read += 1
+            if stats.read <= resume_at:
+                stats.skipped += 1
+                continue
+            rec = clean_record(raw)
+            if rec is None:
+                stats.invalid += 1
+                continue
+            yield rec
+
+    for batch in chunks(records(), chunk_size):
+        unique: Dict[str, Dict[str, Any]] = {}
+        for rec in batch:
+            unique.setdefault(rec["recipe"]["content_hash"], rec)
+        stats.duplicates += len(batch) - len(unique)
+        batch = list(unique.values())
+        stats.links += write_chunk(sb, batch)
+        stats.recipes += len(batch)
+        stats.chunks += 1
+        write_checkpoint(checkpoint, stats.read)
+        if progress:
+            progress(stats.as_dict())
+    write_checkpoint(checkpoint, stats.read)
+    return stats.as_dict()
+
+def import_file(sb, path: str, fmt: str = "", chunk_size: int = 500, checkpoint: str = "", progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return import_stream(sb, f, fmt or detect_format(path), chunk_size, checkpoint, progress)
+
+def main(argv: List[str] = None) -> int:
+    p = argparse.ArgumentParser(description="Stream recipes from JSONL or CSV into Supabase.")
+    p.add_argument("path")
+    p.add_argument("--format", choices=["jsonl", "csv"], default="")
+    p.add_argument("--chunk", type=int, default=500)
+    p.add_argument("--checkpoint", default="", help="file recording progress; rerun with the same path to resume")
+    args = p.parse_args(argv)
+    from .supabase_client import get_admin_client
+    checkpoint = args.checkpoint or args.path + ".checkpoint"
+
+    def report(st: Dict[str, Any]):
+        print(f"{st['read']} read, {st['recipes']} recipes, {st['links']} links, {st['duplicates']} duplicates, {st['invalid']} invalid, {st['recipes_per_second']} recipes/s", file=sys.stderr)
+
+    stats = import_file(get_admin_client(), args.path, args.format, args.chunk, checkpoint, report)
+    print(json.dumps(stats))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
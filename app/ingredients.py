@@ -0,0 +1,171 @@
+import bisect
+import json
+import os
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+SYNONYMS = {
+    "scallion": "spring onion",
+    "green onion": "spring onion",
+    "capsicum": "bell pepper",
+    "sweet pepper": "bell pepper",
+    "aubergine": "eggplant",
+    "courgette": "zucchini",
+    "coriander": "cilantro",
+    "garbanzo bean": "chickpea",
+    "chick pea": "chickpea",
+    "rocket": "arugula",
+    "prawn": "shrimp",
+    "minced beef": "ground beef",
+    "beef mince": "ground beef",
+    "yoghurt": "yogurt",
+    "chilli": "chili",
+    "chilli flakes": "chili flakes",
+    "chili flake": "chili flakes",
+    "red pepper flakes": "chili flakes",
+    "oat": "oats",
+    "spaghetti": "pasta",
+    "extra virgin olive oil": "olive oil",
+    "soya sauce": "soy sauce",
+}
+
+INVARIANT = {"oats", "chili flakes", "hummus", "asparagus", "couscous", "molasses", "swiss", "grits", "brussels"}
+
+IRREGULAR = {
+    "leaves": "leaf",
+    "loaves": "loaf",
+    "halves": "half",
+    "knives": "knife",
+    "cookies": "cookie",
+    "brownies": "brownie",
+    "chillies": "chilli",
+    "chilies": "chili",
+}
+
+def normalize_name(s: str) -> str:
+    return " ".join((s or "").strip().lower().split())
+
+def singular(word: str) -> str:
+    if word in INVARIANT or len(word) <= 3 or not word.endswith("s"):
+        return word
+    if word in IRREGULAR:
+        return IRREGULAR[word]
+    if word.endswith(("ss", "us", "is")):
+        return word
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith(("oes", "ches", "shes", "sses", "xes", "zes")):
+        return word[:-2]
+    return word[:-1]
+
+def extra_synonyms(path: str) -> Dict[str, str]:
+    if not path:
+        return {}
+    try:
+        with open(path) as f:
+            extra = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(extra, dict):
+        return {}
+    return {normalize_name(k): normalize_name(v) for k, v in extra.items() if k and v}
+
+SYNONYMS.update(extra_synonyms(os.getenv("INGREDIENT_SYNONYMS", "")))
+
+@lru_cache(maxsize=65536)
+def canonical(s: str) -> str:
+    name = normalize_name(s)
+    if not name or name in INVARIANT:
+        return name
+    name = SYNONYMS.get(name, name)
+    head, _, last = name.rpartition(" ")
+    one = f"{head} {singular(last)}" if head else singular(last)
+    return SYNONYMS.get(one, one)
+
+def normalize(items: List[str]) -> List[str]:
+    out = []
+    for i in items or []:
+        s = canonical(i)
+        if s:
+            out.append(s)
+    return out
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > limit:
+            return limit + 1
+        prev = cur
+    return prev[-1]
+
+def trigrams(s: str) -> List[str]:
+    s = f" {s} "
+    return [s[i:i + 3] for i in range(len(s) - 2)]
+
+class NgramIndex:
+    def __init__(self, names: Iterable[str]):
+        self.names = sorted({n for n in names if n})
+        self.grams: Dict[str, List[int]] = {}
+        self.words: List[Tuple[str, int]] = []
+        for i, name in enumerate(self.names):
+            for g in set(trigrams(name)):
+                self.grams.setdefault(g, []).append(i)
+            for w in name.split()[1:]:
+                self.words.append((w, i))
+        self.words.sort()
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _name_prefix(self, q: str, limit: int) -> List[int]:
+        out = []
+        lo = bisect.bisect_left(self.names, q)
+        for i in range(lo, min(lo + limit, len(self.names))):
+            if not self.names[i].startswith(q):
+                break
+            out.append(i)
+        return out
+
+    def _word_prefix(self, q: str, limit: int) -> List[int]:
+        out = []
+        lo = bisect.bisect_left(self.words, (q, -1))
+        for word, i in self.words[lo:lo + limit]:
+            if not word.startswith(q):
+                break
+            out.append(i)
+        return out
+
+    def candidates(self, q: str, limit: int = 32) -> List[Tuple[int, int]]:
+        counts: Dict[int, int] = {}
+        for g in set(trigrams(q)):
+            for i in self.grams.get(g, ()):
+                counts[i] = counts.get(i, 0) + 1
+        return sorted(counts.items(), key=lambda x: (-x[1], len(self.names[x[0]])))[:limit]
+
+    def complete(self, q: str, limit: int = 8) -> List[str]:
+        q = normalize_name(q)
+        if not q or not self.names:
+            return []
+        seen: Dict[int, None] = {}
+        for i in sorted(self._name_prefix(q, limit * 4), key=lambda i: (len(self.names[i]), self.names[i])):
+            seen.setdefault(i)
+        if len(seen) < limit:
+            for i in self._word_prefix(q, limit * 4):
+                seen.setdefault(i)
+        if len(seen) < limit and len(q) >= 3:
+            c = canonical(q)
+            limit_d = 1 if len(c) < 9 else 2
+            fuzzy = []
+            for i, overlap in self.candidates(c):
+                name = self.names[i]
+                d = min(edit_distance(c, name[:len(c)], limit_d), edit_distance(c, name[:len(c) + 1], limit_d))
+                if d <= limit_d:
+                    fuzzy.append((d, -overlap, len(self.names[i]), i))
+            for *_, i in sorted(fuzzy):
+                seen.setdefault(i)
+        return [self.names[i] for i in list(seen)[:limit]]
@@ -0,0 +1,175 @@
+import argparse
+import asyncio
+import json
+import os
+import pathlib
+import sqlite3
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .config import env_int
+from .importer import clean_record, detect_format, iter_raw
+from .scoring import ScoringMatrix
+
+if TYPE_CHECKING:
+    import numpy as np
+
+LOCAL_PREFIX = "local-"
+LOOKUP_CHUNK = 500
+
+SCHEMA = [
+    "create table if not exists recipes (id text primary key, title text not null, directions text, minutes integer, tags text)",
+    "create table if not exists recipe_ingredients (recipe_id text not null, name text not null, primary key (recipe_id, name)) without rowid",
+    "create table if not exists blobs (name text primary key, data blob not null)",
+]
+
+class LocalRecipeStore:
+    def __init__(self, db: sqlite3.Connection, source: str = ":memory:"):
+        self.source = source
+        self._db = db
+        self._lock = threading.Lock()
+        t0 = time.perf_counter()
+        self.matrix = self._load_matrix()
+        self.open_ms = round((time.perf_counter() - t0) * 1000.0, 3)
+
+    def _blob(self, name: str) -> bytes:
+        row = self._db.execute("select data from blobs where name = ?", (name,)).fetchone()
+        return bytes(row[0]) if row else b""
+
+    def _load_matrix(self) -> ScoringMatrix:
+        import numpy as np
+        with self._lock:
+            ids = self._blob("recipe_ids").decode("utf-8")
+            names = self._blob("names").decode("utf-8")
+            indptr = np.frombuffer(self._blob("indptr") or np.zeros(1, "<i8").tobytes(), dtype="<i8")
+            indices = np.frombuffer(self._blob("indices"), dtype="<i4")
+            inv_total = np.frombuffer(self._blob("inv_total"), dtype="<f8")
+        return ScoringMatrix.from_arrays(ids.split("\n") if ids else [], names.split("\n") if names else [], indptr, indices, inv_total)
+
+    def top_k(self, names: Sequence[str], weights: "np.ndarray", k: int = 5) -> List[Tuple[str, float]]:
+        return self.matrix.top_k(names, weights, k)
+
+    def _select(self, sql: str, ids: List[str]) -> Iterator[tuple]:
+        for i in range(0, len(ids), LOOKUP_CHUNK):
+            part = ids[i:i + LOOKUP_CHUNK]
+            with self._lock:
+                rows = self._db.execute(sql.format(",".join("?" * len(part))), part).fetchall()
+            yield from rows
+
+    def recipes(self, ids: List[str]) -> List[Dict[str, Any]]:
+        out = []
+        for rid, title, directions, minutes, tags in self._select("select id, title, directions, minutes, tags from recipes where id in ({})", list(ids or [])):
+            out.append({"id": rid, "title": title, "directions": directions or "", "minutes": minutes, "tags": json.loads(tags or "[]")})
+        return out
+
+    def ingredients(self, ids: List[str]) -> List[Dict[str, Any]]:
+        return [{"recipe_id": rid, "name": name} for rid, name in self._select("select recipe_id, name from recipe_ingredients where recipe_id in ({})", list(ids or []))]
+
+    def stats(self) -> Dict[str, Any]:
+        return {"source": self.source, "recipes": len(self.matrix.recipe_ids), "ingredients": len(self.matrix.columns), "open_ms": self.open_ms}
+
+def write_store(db: sqlite3.Connection, items: Iterable[Tuple[str, Dict[str, Any], List[str]]]) -> int:
+    for stmt in SCHEMA:
+        db.execute(stmt)
+    postings: Dict[str, List[str]] = {}
+    totals: Dict[str, int] = {}
+    for rid, rec, names in items:
+        if rid in totals:
+            continue
+        db.execute("insert into recipes (id, title, directions, minutes, tags) values (?, ?, ?, ?, ?)", (rid, rec["title"], rec.get("directions") or "", rec.get("minutes"), json.dumps(rec.get("tags") or [])))
+        names = list(dict.fromkeys(n for n in names if n))
+        db.executemany("insert into recipe_ingredients (recipe_id, name) values (?, ?)", [(rid, n) for n in names])
+        for n in names:
+            postings.setdefault(n, []).append(rid)
+        totals[rid] = len(names)
+    m = ScoringMatrix(postings, totals)
+    blobs = {
+        "recipe_ids": "\n".join(m.recipe_ids).encode("utf-8"),
+        "names": "\n".join(m.columns).encode("utf-8"),
+        "indptr": m.indptr.astype("<i8").tobytes(),
+        "indices": m.indices.astype("<i4").tobytes(),
+        "inv_total": m.inv_total.astype("<f8").tobytes(),
+    }
+    db.executemany("insert or replace into blobs (name, data) values (?, ?)", list(blobs.items()))
+    db.commit()
+    return len(totals)
+
+def memory_store(items: Iterable[Tuple[str, Dict[str, Any], List[str]]]) -> LocalRecipeStore:
+    db = sqlite3.connect(":memory:", check_same_thread=False)
+    write_store(db, items)
+    return LocalRecipeStore(db)
+
+def open_store(path: str) -> LocalRecipeStore:
+    db = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True, check_same_thread=False)
+    db.execute(f"pragma mmap_size={max(env_int('LOCAL_RECIPES_MMAP', 256 * 1024 * 1024), 0)}")
+    db.execute("pragma query_only=1")
+    return LocalRecipeStore(db, path)
+
+def load_store(path: str, builtin: Iterable[Tuple[str, Dict[str, Any], List[str]]]) -> LocalRecipeStore:
+    if not path:
+        return memory_store(builtin)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"LOCAL_RECIPES points at a missing file: {path}")
+    try:
+        return open_store(path)
+    except sqlite3.Error as e:
+        raise RuntimeError(f"LOCAL_RECIPES file {path} could not be opened: {e}") from e
+
+class LazyStore:
+    def __init__(self, path: str, builtin: Callable[[], Iterable[Tuple[str, Dict[str, Any], List[str]]]]):
+        self.path = path
+        self.builtin = builtin
+        self._store: Optional[LocalRecipeStore] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> LocalRecipeStore:
+        store = self._store
+        if store is None:
+            with self._lock:
+                if self._store is None:
+                    self._store = load_store(self.path, self.builtin())
+                store = self._store
+        return store
+
+    async def aget(self) -> LocalRecipeStore:
+        store = self._store
+        return store if store is not None else await asyncio.to_thread(self.get)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._store.stats() if self._store is not None else {"source": self.path or ":memory:", "loaded": False}
+
+def iter_catalog(f, fmt: str) -> Iterator[Tuple[str, Dict[str, Any], List[str]]]:
+    for raw in iter_raw(f, fmt):
+        rec = clean_record(raw)
+        if rec is not None:
+            yield LOCAL_PREFIX + rec["recipe"]["content_hash"][:16], rec["recipe"], rec["ingredients"]
+
+def build_file(src: str, out: str, fmt: str = "") -> Dict[str, Any]:
+    t0 = time.monotonic()
+    tmp = out + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    db = sqlite3.connect(tmp)
+    try:
+        db.execute("pragma journal_mode=off")
+        with open(src, newline="", encoding="utf-8") as f:
+            recipes = write_store(db, iter_catalog(f, fmt or detect_format(src)))
+        db.execute("vacuum")
+    finally:
+        db.close()
+    os.replace(tmp, out)
+    return {"recipes": recipes, "bytes": os.path.getsize(out), "seconds": round(time.monotonic() - t0, 2)}
+
+def main(argv: List[str] = None) -> int:
+    p = argparse.ArgumentParser(description="Build an embedded recipe store for offline mode from JSONL or CSV.")
+    p.add_argument("path")
+    p.add_argument("--out", default="recipes.sqlite3")
+    p.add_argument("--format", choices=["jsonl", "csv"], default="")
+    args = p.parse_args(argv)
+    print(json.dumps(build_file(args.path, args.out, args.format)))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,45 +1,163 @@
+from .startup import warmup, fast_start
 from datetime import date
 from typing import List, Optional, Dict, Any, Tuple
-from fastapi import FastAPI, Request, Form
-from fastapi.responses import HTMLResponse, JSONResponse, StreamingResponse, PlainTextResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi import FastAPI, Request, Form, Body, Query, UploadFile, File
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
+from starlette.background import BackgroundTasks
+from starlette.middleware.gzip import GZipMiddleware
 from starlette.middleware.sessions import SessionMiddleware
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from uuid import uuid4
+import asyncio
+import hashlib
 import io
+import json
 import os
+import time
+
+from .supabase_client import get_client, get_admin_client, get_async_client, client_stats, clients, async_clients
+from .db import drain, fetch_recipes, fetch_ingredients, insert_rows
+from .recipe_index import recipe_index
+from .ingredients import SYNONYMS, NgramIndex, canonical, normalize, normalize_name
+from .importer import import_stream, detect_format
+from .local_store import LOCAL_PREFIX, LazyStore
+from .templating import HashedStaticFiles, build_templates, precompile
+from .sessions import build_session_backend, encode_pairs, decode_pairs
+from .events import build_pipeline
+from .config import env_int, env_float
+from .cache import LRUCache
+from .scoring import expiry_weights
+from .suggest import SuggestionEngine, CircuitBreaker
+from .metrics import registry, span, current_spans, server_timing, cache_family, Sampler, REQUEST_SECONDS, FALLBACK_TOTAL
+
+def write_events(rows: List[Dict[str, Any]]):
+    get_client().table("events").insert(rows).execute()
 
-from .supabase_client import get_client, get_admin_client
+events = build_pipeline(write_events)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if not fast_start():
+        warmup.start()
+    events.start()
+    try:
+        yield
+    finally:
+        await drain()
+        events.stop()
+        clients.close()
+        await async_clients.close()
+        await suggest_engine.close()
+        pdf_pool.shutdown(wait=False)
 
-app = FastAPI(title="LeftoverChef")
+app = FastAPI(title="LeftoverChef", lifespan=lifespan)
 app.add_middleware(SessionMiddleware, secret_key=os.getenv("SESSION_SECRET", "dev-secret"))
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-templates = Jinja2Templates(directory="app/templates")
+app.add_middleware(GZipMiddleware, minimum_size=env_int("GZIP_MIN_SIZE", 500))
+static_files = HashedStaticFiles("app/static")
+app.mount("/static", static_files, name="static")
+templates = build_templates("app/templates")
+templates.env.globals["static_url"] = static_files.url
 BOOT_ID = os.getenv("SESSION_BOOT_ID") or str(uuid4())
+session_store = build_session_backend()
+recipe_cache = LRUCache(env_int("RECIPE_CACHE_SIZE", 512), env_float("RECIPE_CACHE_TTL", 600.0))
+pdf_cache = LRUCache(env_int("PDF_CACHE_SIZE", 128), env_float("PDF_CACHE_TTL", 3600.0))
+profiles = LRUCache(env_int("PROFILE_KEEP", 32), 0)
+pdf_pool = ThreadPoolExecutor(max_workers=env_int("PDF_WORKERS", 2), thread_name_prefix="pdf")
+
+def template_hash(*names: str) -> str:
+    h = hashlib.sha1()
+    for n in names:
+        try:
+            with open(os.path.join("app/templates", n), "rb") as f:
+                h.update(f.read())
+        except OSError:
+            pass
+    return h.hexdigest()
+
+RECIPE_TEMPLATE_HASH = template_hash("base.html", "recipe.html") + static_files.digest("app.js") + static_files.digest("styles.css")
+
+def render(name: str, context: Dict[str, Any], **kwargs):
+    with span(f"render.{name.rsplit('/', 1)[-1].split('.')[0]}"):
+        return templates.TemplateResponse(name, context, **kwargs)
+
+def run_after(response: Response, fn, *args):
+    tasks = BackgroundTasks()
+    if response.background is not None:
+        tasks.add_task(response.background)
+    tasks.add_task(fn, *args)
+    response.background = tasks
+
+def is_htmx(request: Request) -> bool:
+    return request.headers.get("hx-request") == "true"
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    spans = []
+    token = current_spans.set(spans)
+    sampler = None
+    if os.getenv("PROFILE_REQUESTS", "false").lower() == "true" and request.headers.get("x-profile"):
+        sampler = Sampler(env_float("PROFILE_INTERVAL", 0.005))
+        sampler.start()
+    t0 = time.perf_counter()
+    profile = None
+    try:
+        response = await call_next(request)
+    finally:
+        current_spans.reset(token)
+        if sampler is not None:
+            profile = sampler.stop()
+    total = time.perf_counter() - t0
+    route = request.scope.get("route")
+    REQUEST_SECONDS.observe(total, request.method, getattr(route, "path", "unmatched"), response.status_code)
+    response.headers["Server-Timing"] = server_timing(spans, total)
+    if not warmup.started():
+        run_after(response, warmup.start)
+    if events.pending():
+        run_after(response, events.flush)
+    if profile is not None:
+        pid = uuid4().hex[:12]
+        profiles.set(pid, profile)
+        response.headers["X-Profile-Id"] = pid
+    return response
 
 FALLBACK_MAP = {
-    "fallback-omelette": {"id":"fallback-omelette","title":"Simple Omelette","minutes":10,"directions":"Whisk 3 eggs with salt and pepper. Heat a non-stick pan with a little butter. Pour in the eggs and cook on medium heat, lifting the edges so the uncooked egg flows underneath. Add chopped herbs, cheese or leftover veggies. Fold and serve warm.","tags":["breakfast","quick"],"keys":["egg","eggs","cheese","bell pepper","onion"]},
-    "fallback-shakshuka": {"id":"fallback-shakshuka","title":"Tomato & Egg Shakshuka","minutes":25,"directions":"Warm olive oil in a skillet. Soften sliced onion and garlic with a pinch of chili. Add crushed tomatoes, salt and a pinch of sugar; simmer until thick. Make small wells and crack in eggs. Cover and cook until whites set and yolks are still soft. Finish with parsley.","tags":["eggs","tomato"],"keys":["tomato","tomatoes","egg","eggs","onion","garlic"]},
-    "fallback-fried-rice": {"id":"fallback-fried-rice","title":"Veggie Fried Rice","minutes":20,"directions":"Heat oil in a wok. Add diced carrot and peas; stir-fry 2–3 min. Add cold cooked rice, soy sauce and a splash of sesame oil; toss to coat. Push rice aside, scramble an egg, then mix through. Finish with sliced spring onion.","tags":["rice","stirfry"],"keys":["rice","egg","eggs","carrot","peas","soy sauce","spring onion"]},
-    "fallback-panzanella": {"id":"fallback-panzanella","title":"Panzanella Salad","minutes":15,"directions":"Toast torn stale bread until crisp. Combine chopped tomatoes, cucumber and red onion with olive oil and red wine vinegar. Toss with bread so it soaks up juices. Season and stand 10 min. Scatter with basil.","tags":["salad","zero-waste"],"keys":["bread","tomato","tomatoes","cucumber","red onion","olive oil","vinegar","basil"]},
+    "fallback-omelette": {"id":"fallback-omelette","title":"Simple Omelette","minutes":10,"directions":"Whisk 3 eggs with salt and pepper. Heat a non-stick pan with a little butter. Pour in the eggs and cook on medium heat, lifting the edges so the uncooked egg flows underneath. Add chopped herbs, cheese or leftover veggies. Fold and serve warm.","tags":["breakfast","quick"],"keys":["egg","cheese","bell pepper","onion"]},
+    "fallback-shakshuka": {"id":"fallback-shakshuka","title":"Tomato & Egg Shakshuka","minutes":25,"directions":"Warm olive oil in a skillet. Soften sliced onion and garlic with a pinch of chili. Add crushed tomatoes, salt and a pinch of sugar; simmer until thick. Make small wells and crack in eggs. Cover and cook until whites set and yolks are still soft. Finish with parsley.","tags":["eggs","tomato"],"keys":["tomato","egg","onion","garlic"]},
+    "fallback-fried-rice": {"id":"fallback-fried-rice","title":"Veggie Fried Rice","minutes":20,"directions":"Heat oil in a wok. Add diced carrot and peas; stir-fry 2–3 min. Add cold cooked rice, soy sauce and a splash of sesame oil; toss to coat. Push rice aside, scramble an egg, then mix through. Finish with sliced spring onion.","tags":["rice","stirfry"],"keys":["rice","egg","carrot","peas","soy sauce","spring onion"]},
+    "fallback-panzanella": {"id":"fallback-panzanella","title":"Panzanella Salad","minutes":15,"directions":"Toast torn stale bread until crisp. Combine chopped tomatoes, cucumber and red onion with olive oil and red wine vinegar. Toss with bread so it soaks up juices. Season and stand 10 min. Scatter with basil.","tags":["salad","zero-waste"],"keys":["bread","tomato","cucumber","red onion","olive oil","vinegar","basil"]},
     "fallback-aglio-olio": {"id":"fallback-aglio-olio","title":"Garlic Olive Oil Pasta (Aglio e Olio)","minutes":15,"directions":"Cook spaghetti in salted water. Gently sizzle sliced garlic in olive oil until pale gold; add chili flakes. Toss pasta with some cooking water to emulsify. Finish with parsley and black pepper.","tags":["pasta"],"keys":["pasta","garlic","olive oil","chili flakes","parsley"]},
     "fallback-salad": {"id":"fallback-salad","title":"Zero-waste Salad","minutes":10,"directions":"Combine chopped vegetables and herbs. Add olive oil, lemon, salt and pepper. Toss and serve with toasted seeds or croutons.","tags":["salad"],"keys":["lettuce","cucumber","tomato","pepper","onion","herbs"]}
 }
 
+local_store = LazyStore(os.getenv("LOCAL_RECIPES", ""), lambda: [(rid, r, normalize(r["keys"])) for rid, r in FALLBACK_MAP.items()])
+vocab_cache: Dict[str, Any] = {"key": None, "index": NgramIndex([])}
+
+def ingredient_vocab() -> NgramIndex:
+    store = local_store.get()
+    key = (recipe_index.generation, id(store))
+    if vocab_cache["key"] != key:
+        vocab_cache["index"] = NgramIndex(list(recipe_index.postings) + list(store.matrix.columns) + list(SYNONYMS) + list(SYNONYMS.values()))
+        vocab_cache["key"] = key
+    return vocab_cache["index"]
+
+async def ingredient_vocab_async() -> NgramIndex:
+    if os.getenv("SUPABASE_URL", "") and os.getenv("SUPABASE_ANON_KEY", ""):
+        try:
+            await recipe_index.aensure(await get_async_client())
+        except Exception:
+            pass
+    store = await local_store.aget()
+    if vocab_cache["key"] != (recipe_index.generation, id(store)):
+        return await asyncio.to_thread(ingredient_vocab)
+    return vocab_cache["index"]
+
 def parse_iso(s: str):
     try:
         return date.fromisoformat(s)
     except Exception:
         return None
 
-def normalize(items: List[str]) -> List[str]:
-    out = []
-    for i in items or []:
-        s = (i or "").strip().lower()
-        if s:
-            out.append(s)
-    return out
-
 def split_valid_outdated(pairs: List[Tuple[str, str]]):
     valid = []
     outdated = []
@@ -52,16 +170,14 @@ def split_valid_outdated(pairs: List[Tuple[str, str]]):
             valid.append((n, e))
     return valid, outdated
 
-def weight_for_expiry(d):
-    if not d:
-        return 1.0
-    today = date.today()
-    delta = (d - today).days
-    if delta <= 0:
-        return 1.6
-    if delta >= 30:
-        return 1.0
-    return 1.0 + 0.6 * (30 - delta) / 30.0
+def pantry_pairs(names: Optional[List[str]], expiries: Optional[List[str]]) -> List[Tuple[str, str]]:
+    exps = [str(x or "").strip() for x in (expiries or [])]
+    pairs = []
+    for i, raw in enumerate(names or []):
+        name = normalize([str(raw or "")])
+        if name:
+            pairs.append((name[0], exps[i] if i < len(exps) else ""))
+    return pairs
 
 def build_use_first(pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
     items = []
@@ -78,80 +194,101 @@ def build_use_first(pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
     items.sort(key=sort_key)
     return items
 
-def fallback_suggest(ingredients: List[str]) -> List[Dict[str, Any]]:
-    s = set(ingredients)
+def pantry_weights(valid_pairs: List[Tuple[str, str]]):
+    import numpy as np
+    names = []
+    dates = []
+    for n, e in valid_pairs or []:
+        nn = normalize_name(n)
+        if nn:
+            names.append(nn)
+            dates.append(parse_iso(e) if e else None)
+    wmap = {}
+    for nn, w in zip(names, expiry_weights(dates).tolist()):
+        wmap[nn] = max(wmap.get(nn, 1.0), w)
+    return list(wmap), np.array(list(wmap.values()), dtype=np.float64)
+
+def pantry_tops(pantries: List[List[Tuple[str, str]]], k: int) -> List[List[Tuple[str, float]]]:
+    matrix = recipe_index.matrix()
+    tops = []
+    for valid_pairs in pantries:
+        names, weights = pantry_weights(valid_pairs)
+        tops.append(matrix.top_k(names, weights, k) if names else [])
+    return tops
+
+def attach_recipes(tops: List[List[Tuple[str, float]]], recs: List[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+    by_id = {rec["id"]: rec for rec in recs or []}
     out = []
-    for rid, r in FALLBACK_MAP.items():
-        if s & set(r["keys"]):
-            out.append({"id":rid,"title":r["title"],"directions":r["directions"],"minutes":r["minutes"],"tags":r["tags"],"score":0.5})
-    if not out and s:
+    for top in tops:
+        ranked = []
+        for rid, score in top:
+            rec = by_id.get(rid)
+            if not rec:
+                continue
+            ranked.append({"id":rec["id"],"title":rec["title"],"directions":rec["directions"],"minutes":rec.get("minutes"),"tags":rec.get("tags",[]),"score":score})
+        out.append(ranked)
+    return out
+
+def fallback_suggest(valid_pairs: List[Tuple[str, str]], k: int = 5) -> List[Dict[str, Any]]:
+    names, weights = pantry_weights(valid_pairs)
+    store = local_store.get()
+    top = store.top_k(names, weights, k) if names else []
+    out = attach_recipes([top], store.recipes([rid for rid, _ in top]))[0]
+    if not out and names:
         r = FALLBACK_MAP["fallback-salad"]
         out.append({"id":r["id"],"title":r["title"],"directions":r["directions"],"minutes":r["minutes"],"tags":r["tags"],"score":0.35})
-    return out[:5]
+    return out
 
-def score_with_db(valid_pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+async def rank_pantries_async(pantries: List[List[Tuple[str, str]]], k: int = 5) -> List[List[Dict[str, Any]]]:
     url = os.getenv("SUPABASE_URL", "")
     key = os.getenv("SUPABASE_ANON_KEY", "")
     if not url or not key:
-        return []
-    sb = get_client()
-    ri = sb.table("recipe_ingredients").select("recipe_id,name").execute()
-    if not ri.data:
-        return []
-    wmap = {}
-    names = []
-    for n, e in valid_pairs or []:
-        ed = parse_iso(e) if e else None
-        w = weight_for_expiry(ed)
-        nn = (n or "").strip().lower()
-        if nn:
-            names.append(nn)
-            wmap[nn] = max(wmap.get(nn, 1.0), w)
-    wanted = set(names)
-    if not wanted:
-        return []
-    counts = {}
-    for row in ri.data:
-        rid = row.get("recipe_id")
-        name = (row.get("name") or "").strip().lower()
-        if not rid or not name:
-            continue
-        c = counts.setdefault(rid, {"match_w": 0.0, "total": 0})
-        c["total"] += 1
-        if name in wanted:
-            c["match_w"] += wmap.get(name, 1.0)
-    if not counts:
-        return []
-    ids = list(counts.keys())
-    recs = sb.table("recipes").select("id,title,directions,minutes,tags").in_("id", ids).execute().data
-    out = []
-    for rec in recs:
-        c = counts.get(rec["id"], {"match_w": 0.0, "total": 1})
-        base = c["match_w"] / max(c["total"], 1)
-        ease = 1.0 / max(c["total"], 1)
-        score = float(base + 0.12 * ease)
-        out.append({"id":rec["id"],"title":rec["title"],"directions":rec["directions"],"minutes":rec.get("minutes"),"tags":rec.get("tags",[]),"score":score})
-    out.sort(key=lambda x: x["score"], reverse=True)
-    return out[:5]
-
-def score_recipes(pairs: List[Tuple[str, str]]):
+        return [[] for _ in pantries]
+    asb = await get_async_client()
+    await recipe_index.aensure(asb)
+    tops = pantry_tops(pantries, k)
+    ids = list({rid for top in tops for rid, _ in top})
+    if not ids:
+        return [[] for _ in pantries]
+    return attach_recipes(tops, await fetch_recipes(asb, ids))
+
+async def score_with_db_async(valid_pairs: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    return (await rank_pantries_async([valid_pairs]))[0]
+
+async def traced_fallback(valid_pairs: List[Tuple[str, str]], reason: str) -> List[Dict[str, Any]]:
+    FALLBACK_TOTAL.inc(reason)
+    await local_store.aget()
+    with span("fallback"):
+        return fallback_suggest(valid_pairs)
+
+async def score_recipes_async(pairs: List[Tuple[str, str]]):
     valid, outdated = split_valid_outdated(pairs)
     url = os.getenv("SUPABASE_URL", "")
     key = os.getenv("SUPABASE_ANON_KEY", "")
     if not url or not key:
-        return fallback_suggest([n for n,_ in valid]), outdated
+        return await traced_fallback(valid, "offline"), outdated
     try:
-        out = score_with_db(valid)
+        with span("score"):
+            out = await score_with_db_async(valid)
         if not out:
-            return fallback_suggest([n for n,_ in valid]), outdated
+            return await traced_fallback(valid, "no_match"), outdated
         return out, outdated
     except Exception:
-        return fallback_suggest([n for n,_ in valid]), outdated
+        return await traced_fallback(valid, "error"), outdated
 
-def set_form_session(request: Request, pairs: List[Tuple[str, str]]):
-    request.session["pairs"] = pairs
+async def set_form_session(request: Request, pairs: List[Tuple[str, str]]):
+    if session_store is None:
+        request.session["pairs"] = pairs
+        return
+    sid = request.session.get("sid")
+    if not sid:
+        sid = request.session["sid"] = uuid4().hex
+    await session_store.aset(sid, encode_pairs(pairs))
 
-def get_form_session(request: Request) -> List[Tuple[str, str]]:
+async def get_form_session(request: Request) -> List[Tuple[str, str]]:
+    if session_store is not None:
+        sid = request.session.get("sid")
+        return decode_pairs(await session_store.aget(sid)) if sid else []
     data = request.session.get("pairs") or []
     if not isinstance(data, list):
         return []
@@ -184,8 +321,7 @@ def reset_and_seed_supabase():
         for k in ["fallback-omelette","fallback-shakshuka","fallback-fried-rice","fallback-panzanella","fallback-aglio-olio"]:
             r = FALLBACK_MAP[k]
             recipes.append({"title":r["title"],"minutes":r["minutes"],"directions":r["directions"],"tags":r["tags"]})
-        sb.table("recipes").insert(recipes).execute()
-        rows = sb.table("recipes").select("id,title").in_("title", [r["title"] for r in recipes]).execute().data
+        rows = sb.table("recipes").insert(recipes).execute().data or []
         by_title = {r["title"]: r["id"] for r in rows}
         links = []
         for k in ["fallback-omelette","fallback-shakshuka","fallback-fried-rice","fallback-panzanella","fallback-aglio-olio"]:
@@ -193,15 +329,21 @@ def reset_and_seed_supabase():
             rid = by_title.get(r["title"])
             if not rid:
                 continue
-            for n in r["keys"]:
+            for n in normalize(r["keys"]):
                 links.append({"recipe_id": rid, "name": n})
         if links:
             sb.table("recipe_ingredients").insert(links).execute()
     except Exception:
         return
+    finally:
+        recipe_index.invalidate()
+        recipe_cache.clear()
 
 def ensure_boot(request: Request):
     if request.session.get("boot") != BOOT_ID:
+        sid = request.session.get("sid")
+        if sid and session_store is not None:
+            session_store.delete(sid)
         request.session.clear()
         request.session["boot"] = BOOT_ID
 
@@ -210,143 +352,240 @@ def log_event(name: str, extra: Dict[str, Any] = None):
     key = os.getenv("SUPABASE_ANON_KEY", "")
     if not url or not key:
         return
-    try:
-        sb = get_client()
-        sb.table("events").insert({"type": name, "meta": extra or {}}).execute()
-    except Exception:
-        return
+    events.emit({"type": name, "meta": extra or {}})
 
 @app.get("/", response_class=HTMLResponse)
-def index(request: Request):
+async def index(request: Request):
     ensure_boot(request)
-    pairs = get_form_session(request)
+    pairs = await get_form_session(request)
     valid, outdated = split_valid_outdated(pairs)
     use_first = build_use_first(pairs)
     today_iso = date.today().isoformat()
     offline = not (os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_ANON_KEY"))
     log_event("page_view", {})
-    return templates.TemplateResponse("index.html", {"request": request, "suggestions": [], "ingredients_list": pairs, "recipes": [], "use_first": use_first, "outdated": outdated, "all_outdated": bool(pairs and not valid), "today": today_iso, "offline": offline})
+    return render("index.html", {"request": request, "suggestions": [], "ingredients_list": pairs, "recipes": [], "use_first": use_first, "outdated": outdated, "all_outdated": bool(pairs and not valid), "today": today_iso, "offline": offline})
+
+async def record_submission(pairs: List[Tuple[str, str]]):
+    batch_id = str(uuid4())
+    rows = []
+    for n, e in pairs:
+        ed = parse_iso(e) if e else None
+        rows.append({"batch_id": batch_id, "name": n, "expiry": ed.isoformat() if ed else None})
+    try:
+        await insert_rows(await get_async_client(), "ingredients_submissions", rows)
+    except Exception:
+        pass
 
 @app.post("/plan", response_class=HTMLResponse)
-def plan(request: Request, ingredient: Optional[List[str]] = Form(default=None), expiry: Optional[List[str]] = Form(default=None)):
+async def plan(request: Request, ingredient: Optional[List[str]] = Form(default=None), expiry: Optional[List[str]] = Form(default=None)):
     ensure_boot(request)
-    names = normalize(ingredient)
-    pairs = list(zip(names, (expiry or [""] * len(names))))
-    set_form_session(request, pairs)
+    pairs = pantry_pairs(ingredient, expiry)
+    await set_form_session(request, pairs)
     url = os.getenv("SUPABASE_URL", "")
     key = os.getenv("SUPABASE_ANON_KEY", "")
-    if names and url and key:
-        try:
-            sb = get_client()
-            batch_id = str(uuid4())
-            rows = []
-            for n, e in pairs:
-                ed = parse_iso(e) if e else None
-                rows.append({"batch_id": batch_id, "name": n, "expiry": ed})
-            sb.table("ingredients_submissions").insert(rows).execute()
-        except Exception:
-            pass
-    recipe_scores, outdated = score_recipes(pairs)
+    recipe_scores, outdated = await score_recipes_async(pairs)
     suggestions = [r["title"] for r in recipe_scores] if recipe_scores else []
     use_first = build_use_first(pairs)
-    today_iso = date.today().isoformat()
-    offline = not (os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_ANON_KEY"))
+    all_outdated = bool(pairs and not [p for p in pairs if p not in outdated])
     log_event("plan_submit", {"count": len(pairs)})
-    return templates.TemplateResponse("index.html", {"request": request, "suggestions": suggestions, "ingredients_list": pairs, "recipes": recipe_scores, "use_first": use_first, "outdated": outdated, "all_outdated": bool(pairs and not [p for p in pairs if p not in outdated]), "today": today_iso, "offline": offline})
+    if is_htmx(request):
+        response = render("partials/plan.html", {"request": request, "suggestions": suggestions, "recipes": recipe_scores, "use_first": use_first, "outdated": outdated, "all_outdated": all_outdated})
+    else:
+        today_iso = date.today().isoformat()
+        offline = not (url and key)
+        response = render("index.html", {"request": request, "suggestions": suggestions, "ingredients_list": pairs, "recipes": recipe_scores, "use_first": use_first, "outdated": outdated, "all_outdated": all_outdated, "today": today_iso, "offline": offline})
+    if pairs and url and key:
+        run_after(response, record_submission, pairs)
+    return response
 
-@app.get("/recipe/{rid}", response_class=HTMLResponse)
-def recipe_detail(request: Request, rid: str):
-    ensure_boot(request)
+def render_shopping_pdf(title: str, need: List[str]) -> bytes:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.pdfgen import canvas
+    buf = io.BytesIO()
+    c = canvas.Canvas(buf, pagesize=letter)
+    w, h = letter
+    y = h - 72
+    c.setFont("Helvetica-Bold", 16)
+    c.drawString(72, y, title)
+    y -= 24
+    c.setFont("Helvetica", 12)
+    if need:
+        for item in need:
+            c.drawString(72, y, f"• {item}")
+            y -= 18
+            if y < 72:
+                c.showPage()
+                y = h - 72
+    else:
+        c.drawString(72, y, "No missing items.")
+    c.showPage()
+    c.save()
+    return buf.getvalue()
+
+def pdf_key(title: str, need: List[str]) -> str:
+    return hashlib.sha1(json.dumps([title, need]).encode()).hexdigest()
+
+async def shopping_pdf_async(title: str, need: List[str]) -> bytes:
+    key = pdf_key(title, need)
+    pdf = pdf_cache.get(key)
+    if pdf is None:
+        pdf = await asyncio.get_running_loop().run_in_executor(pdf_pool, render_shopping_pdf, title, need)
+        pdf_cache.set(key, pdf)
+    return pdf
+
+def split_steps(directions: str, sentences: bool = True) -> List[str]:
+    directions = (directions or "").strip()
+    parts = [p.strip() for p in directions.replace("\r\n","\n").split("\n") if p.strip()]
+    if sentences and len(parts) <= 1:
+        parts = [x.strip() for x in directions.split(".") if x.strip()]
+    return parts
+
+def recipe_entry(r: Dict[str, Any], ing: List[Dict[str, Any]], steps: List[str]) -> Dict[str, Any]:
+    keys = frozenset(canonical(i["name"]) for i in ing if i.get("name"))
+    digest = hashlib.sha1(json.dumps([RECIPE_TEMPLATE_HASH, r, ing, steps], sort_keys=True, default=str).encode()).hexdigest()
+    return {"recipe": r, "ingredients": ing, "steps": steps, "keys": keys, "etag": f'W/"{digest[:20]}"'}
+
+async def cached_recipes(rids: List[str]) -> Tuple[Dict[str, Dict[str, Any]], List[str]]:
+    out = {}
+    db_ids = []
+    local_ids = []
     url = os.getenv("SUPABASE_URL", "")
     key = os.getenv("SUPABASE_ANON_KEY", "")
+    for rid in rids:
+        if rid in out or rid in db_ids or rid in local_ids:
+            continue
+        entry = recipe_cache.get(rid)
+        if entry is not None:
+            out[rid] = entry
+        elif rid.startswith(("fallback-", LOCAL_PREFIX)) or not url or not key:
+            local_ids.append(rid)
+        else:
+            db_ids.append(rid)
+    for rid in local_ids:
+        r = FALLBACK_MAP.get(rid)
+        if r:
+            out[rid] = recipe_entry(r, [{"name":k} for k in r.get("keys", [])], split_steps(r.get("directions",""), sentences=False))
+            recipe_cache.set(rid, out[rid])
+    local_ids = [rid for rid in local_ids if rid not in out]
+    if local_ids:
+        store = await local_store.aget()
+        cache_recipe_rows(out, store.recipes(local_ids), store.ingredients(local_ids))
+    return out, db_ids
+
+def cache_recipe_rows(out: Dict[str, Dict[str, Any]], recs: List[Dict[str, Any]], rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    ing_by = {}
+    for row in rows or []:
+        ing_by.setdefault(row.get("recipe_id"), []).append({"name": row.get("name")})
+    for r in recs or []:
+        out[r["id"]] = recipe_entry(r, ing_by.get(r["id"], []), split_steps(r.get("directions") or ""))
+        recipe_cache.set(r["id"], out[r["id"]])
+    return out
+
+async def load_recipes_async(rids: List[str]) -> Dict[str, Dict[str, Any]]:
+    out, db_ids = await cached_recipes(rids)
+    if not db_ids:
+        return out
+    asb = await get_async_client()
+    recs, rows = await asyncio.gather(fetch_recipes(asb, db_ids), fetch_ingredients(asb, db_ids))
+    return cache_recipe_rows(out, recs, rows)
+
+async def load_recipe_async(rid: str) -> Optional[Dict[str, Any]]:
+    return (await load_recipes_async([rid])).get(rid)
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match") or ""
+    tags = [t.strip() for t in header.split(",") if t.strip()]
+    return "*" in tags or etag in tags or etag[2:] in tags
+
+@app.get("/recipe/{rid}", response_class=HTMLResponse)
+async def recipe_detail(request: Request, rid: str):
+    ensure_boot(request)
     log_event("view_recipe", {"rid": rid})
-    if rid.startswith("fallback-") or not url or not key:
-        r = FALLBACK_MAP.get(rid) or {"title":"Recipe","minutes":None,"tags":[],"directions":"No extra details available."}
-        steps = [p.strip() for p in (r.get("directions","").replace("\r\n","\n").split("\n")) if p.strip()]
-        return templates.TemplateResponse("recipe.html", {"request": request, "recipe": r, "ingredients": [{"name":k} for k in r.get("keys", [])], "steps": steps})
     try:
-        sb = get_client()
-        r = sb.table("recipes").select("id,title,directions,minutes,tags").eq("id", rid).single().execute().data
-        ing = sb.table("recipe_ingredients").select("name").eq("recipe_id", rid).execute().data
-        directions = (r.get("directions") or "").strip()
-        parts = [p.strip() for p in directions.replace("\r\n","\n").split("\n") if p.strip()]
-        if len(parts) <= 1:
-            tmp = [x.strip() for x in directions.split(".") if x.strip()]
-            parts = tmp
-        return templates.TemplateResponse("recipe.html", {"request": request, "recipe": r, "ingredients": ing, "steps": parts})
+        entry = await load_recipe_async(rid)
     except Exception:
+        entry = None
+    if entry is None:
         r = {"title":"Recipe","minutes":None,"tags":[],"directions":"No extra details available."}
-        return templates.TemplateResponse("recipe.html", {"request": request, "recipe": r, "ingredients": [], "steps": []})
+        return render("recipe.html", {"request": request, "recipe": r, "ingredients": [], "steps": []})
+    headers = {"ETag": entry["etag"], "Cache-Control": "private, no-cache"}
+    if etag_matches(request, entry["etag"]):
+        return Response(status_code=304, headers=headers)
+    return render("recipe.html", {"request": request, "recipe": entry["recipe"], "ingredients": entry["ingredients"], "steps": entry["steps"]}, headers=headers)
 
 @app.get("/recipe/{rid}/shopping")
-def shopping_list(request: Request, rid: str, format: str = "txt"):
+async def shopping_list(request: Request, rid: str, format: str = "txt"):
     ensure_boot(request)
-    pairs = get_form_session(request)
+    pairs = await get_form_session(request)
     valid, _ = split_valid_outdated(pairs)
     have = set([n for n,_ in valid])
-    url = os.getenv("SUPABASE_URL", "")
-    key = os.getenv("SUPABASE_ANON_KEY", "")
     title = "Recipe"
     need = []
-    if rid.startswith("fallback-") or not url or not key:
-        r = FALLBACK_MAP.get(rid)
-        if r:
-            title = r["title"]
-            need = sorted(list(set(r["keys"]) - have))
-    else:
-        try:
-            sb = get_client()
-            rec = sb.table("recipes").select("title").eq("id", rid).single().execute().data
-            title = rec["title"]
-            ing = sb.table("recipe_ingredients").select("name").eq("recipe_id", rid).execute().data
-            keys = set([(i["name"] or "").strip().lower() for i in ing if i.get("name")])
-            need = sorted(list(keys - have))
-        except Exception:
-            need = []
+    try:
+        entry = await load_recipe_async(rid)
+    except Exception:
+        entry = None
+    if entry:
+        title = entry["recipe"]["title"]
+        need = sorted(list(entry["keys"] - have))
     log_event("download_shopping", {"rid": rid, "count": len(need)})
+    text = f"Shopping list — {title}\n" + ("\n".join(f"- {x}" for x in need) if need else "No missing items.")
     if format == "pdf":
         try:
-            from reportlab.lib.pagesizes import letter
-            from reportlab.pdfgen import canvas
-            buf = io.BytesIO()
-            c = canvas.Canvas(buf, pagesize=letter)
-            w, h = letter
-            y = h - 72
-            c.setFont("Helvetica-Bold", 16)
-            c.drawString(72, y, f"Shopping list — {title}")
-            y -= 24
-            c.setFont("Helvetica", 12)
-            if need:
-                for item in need:
-                    c.drawString(72, y, f"• {item}")
-                    y -= 18
-                    if y < 72:
-                        c.showPage()
-                        y = h - 72
-            else:
-                c.drawString(72, y, "No missing items.")
-            c.showPage()
-            c.save()
-            buf.seek(0)
-            return StreamingResponse(buf, media_type="application/pdf", headers={"Content-Disposition": f'attachment; filename="shopping_{rid}.pdf"'})
+            pdf = await shopping_pdf_async(f"Shopping list — {title}", need)
+            return Response(pdf, media_type="application/pdf", headers={"Content-Disposition": f'attachment; filename="shopping_{rid}.pdf"'})
         except Exception:
-            text = f"Shopping list — {title}\n" + ("\n".join(f"- {x}" for x in need) if need else "No missing items.")
-            return PlainTextResponse(text, headers={"Content-Disposition": f'attachment; filename="shopping_{rid}.txt"'})
-    text = f"Shopping list — {title}\n" + ("\n".join(f"- {x}" for x in need) if need else "No missing items.")
+            pass
     return PlainTextResponse(text, headers={"Content-Disposition": f'attachment; filename="shopping_{rid}.txt"'})
 
+@app.get("/shopping")
+async def shopping_combined(request: Request, rid: List[str] = Query(default=[]), format: str = "txt"):
+    ensure_boot(request)
+    rids = list(dict.fromkeys(r for r in rid if r))[:env_int("SHOPPING_MAX_RECIPES", 50)]
+    pairs = await get_form_session(request)
+    valid, _ = split_valid_outdated(pairs)
+    have = set([n for n,_ in valid])
+    try:
+        entries = await load_recipes_async(rids)
+    except Exception:
+        entries = {}
+    wanted = {}
+    titles = []
+    for r in rids:
+        entry = entries.get(r)
+        if not entry:
+            continue
+        titles.append(entry["recipe"]["title"])
+        for name in entry["keys"] - have:
+            wanted.setdefault(name, []).append(entry["recipe"]["title"])
+    need = [f"{name} ({', '.join(wanted[name])})" if len(titles) > 1 else name for name in sorted(wanted)]
+    title = "Shopping list"
+    if titles:
+        title += f" — {', '.join(titles)}" if len(titles) <= 3 else f" — {len(titles)} recipes"
+    log_event("download_shopping", {"rids": rids, "count": len(need)})
+    if format == "pdf":
+        try:
+            pdf = await shopping_pdf_async(title, need)
+            return Response(pdf, media_type="application/pdf", headers={"Content-Disposition": 'attachment; filename="shopping.pdf"'})
+        except Exception:
+            pass
+    text = f"{title}\n" + ("\n".join(f"- {x}" for x in need) if need else "No missing items.")
+    return PlainTextResponse(text, headers={"Content-Disposition": 'attachment; filename="shopping.txt"'})
+
 @app.post("/row", response_class=HTMLResponse)
-def row(request: Request):
+async def row(request: Request):
     ensure_boot(request)
     today_iso = date.today().isoformat()
-    return templates.TemplateResponse("partials/ingredient_row.html", {"request": request, "today": today_iso})
+    return render("partials/ingredient_row.html", {"request": request, "today": today_iso})
 
 @app.post("/save")
-def save(request: Request, ingredient: Optional[List[str]] = Form(default=None), expiry: Optional[List[str]] = Form(default=None)):
+async def save(request: Request, ingredient: Optional[List[str]] = Form(default=None), expiry: Optional[List[str]] = Form(default=None)):
     ensure_boot(request)
-    names = normalize(ingredient)
-    pairs = list(zip(names, (expiry or [""] * len(names))))
-    set_form_session(request, pairs)
+    pairs = pantry_pairs(ingredient, expiry)
+    await set_form_session(request, pairs)
+    if is_htmx(request):
+        _, outdated = split_valid_outdated(pairs)
+        return render("partials/use_first.html", {"request": request, "use_first": build_use_first(pairs), "outdated": outdated})
     return JSONResponse({"ok": True})
 
 @app.post("/admin/seed")
@@ -356,14 +595,104 @@ def admin_seed():
     reset_and_seed_supabase()
     return JSONResponse({"ok": True})
 
+def string_list(value: Any) -> bool:
+    return value is None or (isinstance(value, list) and all(x is None or isinstance(x, str) for x in value))
+
+@app.post("/api/plan/batch")
+async def plan_batch(payload: dict = Body(default=None)):
+    body = payload or {}
+    pantries = body.get("pantries") or []
+    limit = env_int("PLAN_BATCH_MAX", 500)
+    if not isinstance(pantries, list) or len(pantries) > limit:
+        return JSONResponse({"ok": False, "error": f"Send a list of at most {limit} pantries."}, status_code=400)
+    try:
+        k = min(max(int(body.get("k") or 5), 1), 50)
+    except (TypeError, ValueError):
+        k = 5
+    for i, p in enumerate(pantries):
+        if not isinstance(p, dict) or not all(string_list(p.get(f)) for f in ("ingredients", "expiries")):
+            return JSONResponse({"ok": False, "error": f"Pantry {i} needs ingredients and expiries as lists of strings."}, status_code=400)
+    splits = []
+    for p in pantries:
+        splits.append(split_valid_outdated(pantry_pairs(p.get("ingredients"), p.get("expiries"))))
+    try:
+        ranked = await rank_pantries_async([valid for valid, _ in splits], k)
+    except Exception:
+        ranked = [[] for _ in splits]
+    results = []
+    for p, (valid, outdated), recs in zip(pantries, splits, ranked):
+        if not recs:
+            await local_store.aget()
+            recs = fallback_suggest(valid, k)
+        results.append({"id": p.get("id"), "recipes": recs, "outdated": [n for n,_ in outdated]})
+    log_event("plan_batch", {"count": len(results)})
+    return JSONResponse({"ok": True, "results": results})
+
+@app.get("/api/ingredients")
+async def ingredient_suggestions(q: str = "", limit: int = 8):
+    items = (await ingredient_vocab_async()).complete(q, min(max(limit, 1), 20))
+    return JSONResponse({"ok": True, "items": items}, headers={"Cache-Control": "private, max-age=300"})
+
+@app.post("/admin/import")
+def admin_import(request: Request, file: UploadFile = File(...), format: str = "", chunk: int = 500):
+    token = os.getenv("ADMIN_TOKEN", "")
+    if not token or request.headers.get("x-admin-token") != token:
+        return JSONResponse({"ok": False}, status_code=403)
+    if not (os.getenv("SUPABASE_URL", "") and os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")):
+        return JSONResponse({"ok": False, "error": "Supabase service role is not configured."}, status_code=400)
+    fmt = format or detect_format(file.filename or "")
+    try:
+        stats = import_stream(get_admin_client(), io.TextIOWrapper(file.file, encoding="utf-8", newline=""), fmt, max(chunk, 1))
+    except Exception as e:
+        return JSONResponse({"ok": False, "error": str(e)}, status_code=500)
+    finally:
+        recipe_index.invalidate()
+        recipe_cache.clear()
+    return JSONResponse({"ok": True, "stats": stats})
+
+@app.post("/admin/cache/invalidate")
+def admin_cache_invalidate(request: Request, rid: Optional[str] = None):
+    token = os.getenv("ADMIN_TOKEN", "")
+    if not token or request.headers.get("x-admin-token") != token:
+        return JSONResponse({"ok": False}, status_code=403)
+    if rid:
+        removed = recipe_cache.invalidate(rid)
+    else:
+        recipe_cache.clear()
+        recipe_index.invalidate()
+        removed = True
+    return JSONResponse({"ok": True, "removed": removed})
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/profiles/{pid}")
+def debug_profile(pid: str):
+    if os.getenv("PROFILE_REQUESTS", "false").lower() != "true":
+        return JSONResponse({"ok": False}, status_code=403)
+    out = profiles.get(pid)
+    if out is None:
+        return JSONResponse({"ok": False}, status_code=404)
+    return PlainTextResponse(out)
+
+@app.get("/health")
+def health():
+    return JSONResponse({"ok": True, "supabase": client_stats(), "index": recipe_index.stats(), "events": events.stats(), "recipe_cache": recipe_cache.stats(), "local_store": local_store.stats(), "ai": suggest_engine.stats(), "sessions": session_store.stats() if session_store is not None else {"backend": "cookie"}, "startup": warmup.stats()})
 
-from fastapi import Body
-import httpx
-import json
 
 def env_list(s: str) -> list[str]:
     return [x.strip() for x in (s or "").split(",") if x.strip()]
 
+suggest_engine = SuggestionEngine(
+    os.getenv("HF_API_BASE", "https://api-inference.huggingface.co/models"),
+    timeout=env_float("AI_TIMEOUT", 30.0),
+    hedge_delay=env_float("AI_HEDGE_DELAY", 1.5),
+    max_parallel=env_int("AI_MAX_PARALLEL", 3),
+    cache_ttl=env_float("AI_CACHE_TTL", 3600.0),
+    breaker=CircuitBreaker(env_int("AI_BREAKER_THRESHOLD", 3), env_float("AI_BREAKER_COOLDOWN", 60.0), env_float("AI_BREAKER_WINDOW", 300.0)),
+)
+
 @app.post("/api/suggest-ai")
 async def suggest_ai_local(payload: dict = Body(default=None)):
     enable = str(os.getenv("ENABLE_AI","false")).lower() == "true"
@@ -390,21 +719,32 @@ async def suggest_ai_local(payload: dict = Body(default=None)):
         "TinyLlama/TinyLlama-1.1B-Chat-v1.0",
         "Qwen/Qwen2.5-0.5B-Instruct",
     ]
-    async with httpx.AsyncClient(timeout=30) as client:
-        for model in candidates:
-            url = f"https://api-inference.huggingface.co/models/{model}"
-            r = await client.post(url, headers={"Authorization": f"Bearer {hf}"}, json={"inputs": prompt, "parameters": {"max_new_tokens": 250, "temperature": 0.7, "return_full_text": False}})
-            if r.status_code in (202,503):
-                continue
-            if r.status_code == 429:
-                return JSONResponse({"ok": False, "error": "Rate limited, please retry."})
-            if r.status_code != 200:
-                continue
-            out = r.json()
-            if isinstance(out, list):
-                text = str((out[0] or {}).get("generated_text") or (out[0] or {}).get("summary_text") or "").strip()
-            else:
-                text = str(out.get("generated_text") or out.get("summary_text") or "").strip()
-            if text:
-                return JSONResponse({"ok": True, "model": model, "text": text})
-    return JSONResponse({"ok": False, "error": "No model responded. Try again."})
+    return JSONResponse(await suggest_engine.suggest(valid, hf, candidates, prompt))
+
+@warmup.step("templates")
+def warm_templates():
+    precompile(templates)
+
+@warmup.step("local_store")
+def warm_local_store():
+    local_store.get()
+
+@warmup.step("recipe_index")
+def warm_recipe_index():
+    if os.getenv("SUPABASE_URL", "") and os.getenv("SUPABASE_ANON_KEY", ""):
+        recipe_index.ensure(get_client())
+
+@warmup.step("vocabulary")
+def warm_vocabulary():
+    ingredient_vocab()
+
+@registry.collector
+def collect_runtime():
+    ev = events.stats()
+    return cache_family({"recipe": recipe_cache.stats, "pdf": pdf_cache.stats, "ai": suggest_engine.cache.stats}) + [
+        ("leftoverchef_events_dropped_total", "counter", "Analytics events dropped on a full queue.", [f"leftoverchef_events_dropped_total {ev['dropped']}"]),
+        ("leftoverchef_events_queued", "gauge", "Analytics events waiting to be written.", [f"leftoverchef_events_queued {ev['queued']}"]),
+        ("leftoverchef_index_recipes", "gauge", "Recipes in the ingredient index.", [f"leftoverchef_index_recipes {recipe_index.stats()['recipes']}"]),
+    ]
+
+warmup.imported()
@@ -0,0 +1,204 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def label_str(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels: str, amount: float = 1.0):
+        key = tuple(str(x) for x in labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self.values.items())
+        return [f"{self.name}{label_str(self.labels, k)} {v}" for k, v in items]
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.values: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str):
+        key = tuple(str(x) for x in labels)
+        with self._lock:
+            row = self.values.get(key)
+            if row is None:
+                row = self.values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    row[i] += 1
+            row[-2] += 1
+            row[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, list(row)) for k, row in self.values.items())
+        out = []
+        for key, row in items:
+            for i, b in enumerate(self.buckets):
+                le = 'le="%s"' % b
+                out.append(f"{self.name}_bucket{label_str(self.labels, key, le)} {row[i]}")
+            inf = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{label_str(self.labels, key, inf)} {row[-2]}")
+            out.append(f"{self.name}_count{label_str(self.labels, key)} {row[-2]}")
+            out.append(f"{self.name}_sum{label_str(self.labels, key)} {row[-1]}")
+        return out
+
+class Registry:
+    def __init__(self):
+        self.metrics: List = []
+        self.collectors: List[Callable[[], List[Tuple[str, str, str, List[str]]]]] = []
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        m = Counter(name, help, labels)
+        self.metrics.append(m)
+        return m
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        m = Histogram(name, help, labels, buckets)
+        self.metrics.append(m)
+        return m
+
+    def collector(self, fn: Callable[[], List[Tuple[str, str, str, List[str]]]]):
+        self.collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for m in self.metrics:
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(m.samples())
+        for fn in self.collectors:
+            try:
+                families = fn()
+            except Exception:
+                continue
+            for name, kind, help, samples in families:
+                lines.append(f"# HELP {name} {help}")
+                lines.append(f"# TYPE {name} {kind}")
+                lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+REQUEST_SECONDS = registry.histogram("leftoverchef_request_seconds", "HTTP request latency by route.", ("method", "route", "status"))
+SPAN_SECONDS = registry.histogram("leftoverchef_span_seconds", "Duration of traced spans.", ("span",))
+SUPABASE_SECONDS = registry.histogram("leftoverchef_supabase_seconds", "Supabase HTTP call latency.", ("table", "method", "status"))
+FALLBACK_TOTAL = registry.counter("leftoverchef_fallback_total", "Plans served from built-in recipes.", ("reason",))
+
+current_spans: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("current_spans", default=None)
+
+def record(name: str, seconds: float):
+    SPAN_SECONDS.observe(seconds, name)
+    spans = current_spans.get()
+    if spans is not None:
+        spans.append((name, seconds))
+
+@contextmanager
+def span(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0)
+
+def record_supabase(path: str, method: str, status: int, seconds: float):
+    parts = [p for p in path.split("/") if p]
+    table = parts[2] if len(parts) > 2 and parts[0] == "rest" else (parts[0] if parts else "")
+    SUPABASE_SECONDS.observe(seconds, table, method, status)
+    record(f"db.{table}", seconds)
+
+def server_timing(spans: List[Tuple[str, float]], total: float) -> str:
+    agg: Dict[str, List[float]] = {}
+    for name, seconds in spans:
+        row = agg.setdefault(name, [0.0, 0])
+        row[0] += seconds
+        row[1] += 1
+    parts = [f'{name};dur={row[0] * 1000:.1f};desc="x{row[1]}"' for name, row in agg.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+def cache_family(caches: Dict[str, Callable[[], Dict[str, int]]]) -> List[Tuple[str, str, str, List[str]]]:
+    hits, misses, size = [], [], []
+    for name, stats in caches.items():
+        st = stats()
+        hits.append(f'leftoverchef_cache_hits_total{{cache="{name}"}} {st.get("hits", 0)}')
+        misses.append(f'leftoverchef_cache_misses_total{{cache="{name}"}} {st.get("misses", 0)}')
+        size.append(f'leftoverchef_cache_entries{{cache="{name}"}} {st.get("size", 0)}')
+    return [
+        ("leftoverchef_cache_hits_total", "counter", "Cache hits.", hits),
+        ("leftoverchef_cache_misses_total", "counter", "Cache misses.", misses),
+        ("leftoverchef_cache_entries", "gauge", "Entries currently cached.", size),
+    ]
+
+class Sampler:
+    def __init__(self, interval: float = 0.005, package: str = "app", skip: Sequence[str] = ("event-pipeline",)):
+        self.interval = interval
+        self.package = package
+        self.skip = set(skip)
+        self.stacks: Dict[str, int] = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _sample(self):
+        ignore = {t.ident for t in threading.enumerate() if t.name in self.skip}
+        ignore.add(threading.get_ident())
+        marker = f"/{self.package}/"
+        for tid, frame in sys._current_frames().items():
+            if tid in ignore:
+                continue
+            names = []
+            hit = False
+            while frame is not None:
+                code = frame.f_code
+                hit = hit or marker in code.co_filename
+                names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+                frame = frame.f_back
+            if hit:
+                key = ";".join(reversed(names))
+                self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return "\n".join(f"{k} {v}" for k, v in sorted(self.stacks.items(), key=lambda kv: -kv[1]))
@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+from typing import Dict, List, Set
+
+from .config import env_float
+from .metrics import span
+from .ingredients import canonical
+from .db import fetch_ingredient_page, fire_and_forget, ingredient_page
+from .scoring import ScoringMatrix
+
+PAGE_SIZE = 1000
+
+def index_ttl() -> float:
+    return env_float("RECIPE_INDEX_TTL", 300.0)
+
+def index_retry() -> float:
+    return env_float("RECIPE_INDEX_RETRY", 30.0)
+
+class RecipeIndex:
+    def __init__(self):
+        self.version = 0
+        self.postings: Dict[str, Set[str]] = {}
+        self.totals: Dict[str, int] = {}
+        self.built_at = 0.0
+        self.built_version = -1
+        self.generation = 0
+        self._matrix = None
+        self._rebuilding = None
+        self.retry_at = 0.0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def stale(self) -> bool:
+        if self.built_version != self.version:
+            return True
+        return time.monotonic() - self.built_at > index_ttl()
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+    def _ingest(self, rows: List[Dict], postings: Dict[str, Set[str]], totals: Dict[str, int]):
+        for row in rows:
+            rid = row.get("recipe_id")
+            name = canonical(row.get("name"))
+            if not rid or not name:
+                continue
+            ids = postings.setdefault(name, set())
+            if rid not in ids:
+                ids.add(rid)
+                totals[rid] = totals.get(rid, 0) + 1
+
+    def _install(self, postings: Dict[str, Set[str]], totals: Dict[str, int], matrix: ScoringMatrix, version: int):
+        with self._lock:
+            self.postings = postings
+            self.totals = totals
+            self._matrix = matrix
+            self.generation += 1
+            self.built_version = version
+            self.built_at = time.monotonic()
+
+    def rebuild(self, sb):
+        version = self.version
+        postings: Dict[str, Set[str]] = {}
+        totals: Dict[str, int] = {}
+        after = None
+        while True:
+            rows = ingredient_page(sb, after, PAGE_SIZE).execute().data or []
+            if not rows:
+                break
+            self._ingest(rows, postings, totals)
+            after = rows[-1]["id"]
+        self._install(postings, totals, ScoringMatrix(postings, totals), version)
+
+    async def arebuild(self, asb):
+        version = self.version
+        postings: Dict[str, Set[str]] = {}
+        totals: Dict[str, int] = {}
+        after = None
+        while True:
+            rows = await fetch_ingredient_page(asb, after, PAGE_SIZE)
+            if not rows:
+                break
+            self._ingest(rows, postings, totals)
+            after = rows[-1]["id"]
+        matrix = await asyncio.to_thread(ScoringMatrix, postings, totals)
+        self._install(postings, totals, matrix, version)
+
+    def ensure(self, sb):
+        if self.stale():
+            with span("index.rebuild"):
+                self.rebuild(sb)
+
+    async def _refresh(self, asb):
+        try:
+            await self.arebuild(asb)
+        except Exception:
+            self.failures += 1
+            self.retry_at = time.monotonic() + index_retry()
+            raise
+        self.retry_at = 0.0
+
+    async def aensure(self, asb):
+        if not self.stale():
+            return
+        task = self._rebuilding
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            if time.monotonic() < self.retry_at:
+                if self.built_version < 0:
+                    raise RuntimeError("recipe index unavailable, retrying later")
+                return
+            task = self._rebuilding = fire_and_forget(self._refresh(asb))
+        if self.built_version >= 0:
+            return
+        with span("index.rebuild"):
+            await asyncio.shield(task)
+
+    def matrix(self) -> ScoringMatrix:
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = ScoringMatrix(self.postings, self.totals)
+            return self._matrix
+
+    def stats(self) -> Dict[str, int]:
+        return {"version": self.version, "built_version": self.built_version, "ingredients": len(self.postings), "recipes": len(self.totals), "failures": self.failures}
+
+recipe_index = RecipeIndex()
@@ -0,0 +1,69 @@
+from datetime import date
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+EASE_WEIGHT = 0.12
+
+def expiry_weights(expiries: Sequence[Optional[date]], today: Optional[date] = None) -> "np.ndarray":
+    import numpy as np
+    today = today or date.today()
+    days = np.array([(d - today).days if d else np.nan for d in expiries], dtype=np.float64)
+    w = 1.0 + 0.6 * (30.0 - days) / 30.0
+    w = np.where(days <= 0, 1.6, w)
+    w = np.where(days >= 30, 1.0, w)
+    return np.where(np.isnan(days), 1.0, w)
+
+class ScoringMatrix:
+    def __init__(self, postings: Dict[str, Sequence[str]], totals: Dict[str, int]):
+        import numpy as np
+        self.recipe_ids = list(totals)
+        row = {rid: i for i, rid in enumerate(self.recipe_ids)}
+        self.columns = {name: i for i, name in enumerate(postings)}
+        indptr = [0]
+        indices: List[int] = []
+        for name in postings:
+            indices.extend(row[rid] for rid in postings[name] if rid in row)
+            indptr.append(len(indices))
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int64)
+        totals_arr = np.array([max(totals[rid], 1) for rid in self.recipe_ids], dtype=np.float64)
+        self.inv_total = 1.0 / totals_arr if len(totals_arr) else totals_arr
+
+    @classmethod
+    def from_arrays(cls, recipe_ids: List[str], names: List[str], indptr: "np.ndarray", indices: "np.ndarray", inv_total: "np.ndarray") -> "ScoringMatrix":
+        m = cls.__new__(cls)
+        m.recipe_ids = recipe_ids
+        m.columns = {name: i for i, name in enumerate(names)}
+        m.indptr = indptr
+        m.indices = indices
+        m.inv_total = inv_total
+        return m
+
+    def match(self, names: Sequence[str], weights: "np.ndarray") -> "np.ndarray":
+        import numpy as np
+        cols = np.array([self.columns.get(n, -1) for n in names], dtype=np.int64)
+        keep = cols >= 0
+        cols, weights = cols[keep], weights[keep]
+        if not len(cols):
+            return np.zeros(len(self.recipe_ids))
+        starts, ends = self.indptr[cols], self.indptr[cols + 1]
+        lengths = ends - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        rows = self.indices[offsets]
+        return np.bincount(rows, weights=np.repeat(weights, lengths), minlength=len(self.recipe_ids))
+
+    def top_k(self, names: Sequence[str], weights: "np.ndarray", k: int = 5) -> List[Tuple[str, float]]:
+        import numpy as np
+        match = self.match(names, weights)
+        hit = np.flatnonzero(match > 0)
+        if not len(hit):
+            return []
+        scores = (match[hit] + EASE_WEIGHT) * self.inv_total[hit]
+        if len(hit) > k:
+            part = np.argpartition(-scores, k - 1)[:k]
+        else:
+            part = np.arange(len(hit))
+        order = part[np.argsort(-scores[part], kind="stable")]
+        return [(self.recipe_ids[hit[i]], float(scores[i])) for i in order]
@@ -0,0 +1,106 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from .cache import LRUCache
+from .config import env_float, env_int
+
+def encode_pairs(pairs: List[Tuple[str, str]]) -> bytes:
+    lines = []
+    for name, expiry in pairs or []:
+        name = str(name).replace("\t", " ").replace("\n", " ")
+        lines.append(f"{name}\t{str(expiry or '').replace('-', '')}")
+    return "\n".join(lines).encode("utf-8")
+
+def decode_pairs(data: Optional[bytes]) -> List[Tuple[str, str]]:
+    out = []
+    if not data:
+        return out
+    for line in data.decode("utf-8", "replace").split("\n"):
+        name, _, compact = line.partition("\t")
+        expiry = f"{compact[:4]}-{compact[4:6]}-{compact[6:8]}" if len(compact) == 8 and compact.isdigit() else compact
+        out.append((name, expiry))
+    return out
+
+class MemorySessionBackend:
+    def __init__(self, maxsize: int = 10000, ttl: float = 14 * 86400.0):
+        self.cache = LRUCache(maxsize, ttl)
+
+    def get(self, sid: str) -> Optional[bytes]:
+        return self.cache.get(sid)
+
+    def set(self, sid: str, data: bytes):
+        self.cache.set(sid, data)
+
+    async def aget(self, sid: str) -> Optional[bytes]:
+        return self.get(sid)
+
+    async def aset(self, sid: str, data: bytes):
+        self.set(sid, data)
+
+    def delete(self, sid: str):
+        self.cache.invalidate(sid)
+
+    def stats(self):
+        return dict(self.cache.stats(), backend="memory")
+
+class SQLiteSessionBackend:
+    def __init__(self, path: str, maxsize: int = 100000, ttl: float = 14 * 86400.0, sweep_every: int = 500):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sweep_every = sweep_every
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("pragma journal_mode=wal")
+        self._db.execute("pragma synchronous=normal")
+        self._db.execute("create table if not exists sessions (id text primary key, data blob not null, expires real not null)")
+        self._db.execute("create index if not exists sessions_expires on sessions (expires)")
+
+    def get(self, sid: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute("select data, expires from sessions where id = ?", (sid,)).fetchone()
+        if not row or row[1] < time.time():
+            return None
+        return bytes(row[0])
+
+    def set(self, sid: str, data: bytes):
+        with self._lock:
+            self._db.execute("insert or replace into sessions (id, data, expires) values (?, ?, ?)", (sid, data, time.time() + self.ttl))
+            self.writes += 1
+            if self.writes % self.sweep_every == 0:
+                self._sweep()
+
+    async def aget(self, sid: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self.get, sid)
+
+    async def aset(self, sid: str, data: bytes):
+        await asyncio.to_thread(self.set, sid, data)
+
+    def delete(self, sid: str):
+        with self._lock:
+            self._db.execute("delete from sessions where id = ?", (sid,))
+
+    def _sweep(self):
+        self._db.execute("delete from sessions where expires < ?", (time.time(),))
+        over = self._db.execute("select count(*) from sessions").fetchone()[0] - self.maxsize
+        if over > 0:
+            self._db.execute("delete from sessions where id in (select id from sessions order by expires limit ?)", (over,))
+
+    def stats(self):
+        with self._lock:
+            size = self._db.execute("select count(*) from sessions").fetchone()[0]
+        return {"backend": "sqlite", "size": size, "writes": self.writes}
+
+def build_session_backend():
+    kind = os.getenv("SESSION_BACKEND", "cookie")
+    ttl = env_float("SESSION_TTL", 14 * 86400.0)
+    if kind == "sqlite":
+        return SQLiteSessionBackend(os.getenv("SESSION_DB", "sessions.sqlite3"), env_int("SESSION_MAX", 100000), ttl)
+    if kind == "memory":
+        return MemorySessionBackend(env_int("SESSION_MAX", 10000), ttl)
+    return None
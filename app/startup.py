@@ -0,0 +1,114 @@
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+IMPORT_STARTED = time.perf_counter()
+HEAVY_MODULES = ("supabase", "httpx", "numpy", "jinja2", "reportlab")
+
+def fast_start() -> bool:
+    return os.getenv("FAST_START", "true" if os.getenv("VERCEL") else "false").lower() == "true"
+
+class Warmup:
+    def __init__(self):
+        self.steps: List[Tuple[str, Callable[[], Any]]] = []
+        self.timings: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.import_ms: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def step(self, name: str):
+        def register(fn: Callable[[], Any]):
+            self.steps.append((name, fn))
+            return fn
+        return register
+
+    def imported(self):
+        self.import_ms = round((time.perf_counter() - IMPORT_STARTED) * 1000.0, 1)
+
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def run(self):
+        for name, fn in self.steps:
+            t0 = time.perf_counter()
+            try:
+                fn()
+            except Exception as e:
+                self.errors[name] = type(e).__name__
+            self.timings[name] = round((time.perf_counter() - t0) * 1000.0, 1)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fast_start": fast_start(),
+            "import_ms": self.import_ms,
+            "started": self.started(),
+            "steps_ms": dict(self.timings),
+            "errors": dict(self.errors),
+            "loaded": {m: m in sys.modules for m in HEAVY_MODULES},
+        }
+
+warmup = Warmup()
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+        except ValueError:
+            continue
+    return rows
+
+def import_profile(module: str = "app.main", top: int = 20) -> Dict[str, Any]:
+    code = f"import {module}, sys; print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, env=os.environ.copy())
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "import failed")
+    rows = parse_importtime(proc.stderr)
+    total = next((cum for name, _, cum in rows if name == module), 0)
+    packages: Dict[str, int] = {}
+    for name, self_us, _ in rows:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+    return {
+        "module": module,
+        "total_ms": round(total / 1000.0, 1),
+        "loaded": [m for m in proc.stdout.strip().split(",") if m],
+        "packages": sorted(((p, round(us / 1000.0, 1)) for p, us in packages.items()), key=lambda x: -x[1])[:top],
+        "modules": [(n, round(cum / 1000.0, 1)) for n, _, cum in sorted(rows, key=lambda r: -r[2])[:top]],
+    }
+
+def main(argv: List[str] = None) -> int:
+    p = argparse.ArgumentParser(description="Report where import time goes on a cold start.")
+    p.add_argument("--module", default="app.main")
+    p.add_argument("--top", type=int, default=20)
+    args = p.parse_args(argv)
+    report = import_profile(args.module, args.top)
+    print(f"{report['module']}: {report['total_ms']} ms")
+    print(f"heavy modules loaded: {', '.join(report['loaded']) or 'none'}")
+    print("\nby package (self time):")
+    for name, ms in report["packages"]:
+        print(f"  {ms:9.1f} ms  {name}")
+    print("\nby module (cumulative):")
+    for name, ms in report["modules"]:
+        print(f"  {ms:9.1f} ms  {name}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
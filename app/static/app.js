@@ -163,7 +163,10 @@ function saveForm(){
   const form=document.getElementById('ing-form')
   if(!form)return
   const fd=new FormData(form)
-  fetch('/save',{method:'POST',body:fd})
+  fetch('/save',{method:'POST',body:fd,headers:{'HX-Request':'true'}})
+    .then(r=>r.ok?r.text():'')
+    .then(html=>{ const el=document.getElementById('use-first'); if(el&&html) el.outerHTML=html })
+    .catch(()=>{})
 }
 function setBusy(el,on){
   if(!el)return
@@ -186,6 +189,27 @@ document.addEventListener('submit',e=>{
   const sub=e.target && e.target.querySelector('button[type="submit"]')
   if(sub)setBusy(sub,true)
 })
+document.addEventListener('htmx:afterRequest',e=>{
+  const sub=e.target && e.target.querySelector && e.target.querySelector('button[type="submit"]')
+  if(sub)setBusy(sub,false)
+})
+let suggestAbort=null
+document.addEventListener('input',e=>{
+  const t=e.target
+  if(!t||t.name!=='ingredient')return
+  const list=document.getElementById('common-ingredients')
+  const q=String(t.value||'').trim()
+  if(!list||!q)return
+  if(suggestAbort)suggestAbort.abort()
+  suggestAbort=new AbortController()
+  fetch('/api/ingredients?q='+encodeURIComponent(q),{signal:suggestAbort.signal})
+    .then(r=>r.json())
+    .then(d=>{
+      if(!d||!d.items||!d.items.length)return
+      list.replaceChildren(...d.items.map(x=>{ const o=document.createElement('option'); o.value=x; return o }))
+    })
+    .catch(()=>{})
+})
 document.addEventListener('change',e=>{
   const t=e.target
   if(t&&(t.name==='ingredient'||t.name==='expiry')) saveForm()
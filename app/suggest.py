@@ -0,0 +1,123 @@
+import asyncio
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .cache import LRUCache
+
+if TYPE_CHECKING:
+    import httpx
+
+RETRYABLE = (0, 202, 429, 503)
+
+class CircuitBreaker:
+    def __init__(self, threshold: int = 3, cooldown: float = 60.0, window: float = 300.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.window = window
+        self.failures: Dict[str, int] = {}
+        self.last_failure: Dict[str, float] = {}
+        self.opened: Dict[str, float] = {}
+
+    def allow(self, model: str) -> bool:
+        opened_at = self.opened.get(model)
+        return opened_at is None or time.monotonic() - opened_at >= self.cooldown
+
+    def success(self, model: str):
+        self.failures.pop(model, None)
+        self.last_failure.pop(model, None)
+        self.opened.pop(model, None)
+
+    def failure(self, model: str):
+        now = time.monotonic()
+        if now - self.last_failure.get(model, now) > self.window:
+            self.failures.pop(model, None)
+        self.last_failure[model] = now
+        self.failures[model] = self.failures.get(model, 0) + 1
+        if self.failures[model] >= self.threshold:
+            self.opened[model] = now
+
+    def stats(self) -> Dict[str, Any]:
+        return {"failures": dict(self.failures), "open": [m for m in self.opened if not self.allow(m)]}
+
+def extract_text(out: Any) -> str:
+    if isinstance(out, list):
+        first = (out[0] if out else None) or {}
+        return str(first.get("generated_text") or first.get("summary_text") or "").strip()
+    if isinstance(out, dict):
+        return str(out.get("generated_text") or out.get("summary_text") or "").strip()
+    return ""
+
+class SuggestionEngine:
+    def __init__(self, base_url: str, timeout: float = 30.0, hedge_delay: float = 1.5, max_parallel: int = 3, cache_size: int = 256, cache_ttl: float = 3600.0, breaker: Optional[CircuitBreaker] = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.hedge_delay = hedge_delay
+        self.max_parallel = max(max_parallel, 1)
+        self.cache = LRUCache(cache_size, cache_ttl)
+        self.breaker = breaker or CircuitBreaker()
+        self._client: Optional["httpx.AsyncClient"] = None
+
+    def client(self) -> "httpx.AsyncClient":
+        import httpx
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=httpx.Limits(max_connections=20, max_keepalive_connections=10))
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _call(self, model: str, token: str, prompt: str) -> Tuple[str, int, str]:
+        import httpx
+        try:
+            r = await self.client().post(f"{self.base_url}/{model}", headers={"Authorization": f"Bearer {token}"}, json={"inputs": prompt, "parameters": {"max_new_tokens": 250, "temperature": 0.7, "return_full_text": False}})
+        except httpx.HTTPError:
+            return model, 0, ""
+        if r.status_code != 200:
+            return model, r.status_code, ""
+        try:
+            return model, 200, extract_text(r.json())
+        except ValueError:
+            return model, 200, ""
+
+    async def suggest(self, valid: List[str], token: str, candidates: List[str], prompt: str) -> Dict[str, Any]:
+        key = tuple(sorted(set(valid)))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return dict(cached, cached=True)
+        queue = [m for m in candidates if self.breaker.allow(m)]
+        pending = set()
+        rate_limited = False
+        budget = 1
+        try:
+            while queue or pending:
+                while queue and budget > 0 and len(pending) < self.max_parallel:
+                    pending.add(asyncio.ensure_future(self._call(queue.pop(0), token, prompt)))
+                    budget -= 1
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, timeout=self.hedge_delay if queue else None, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    budget = 1
+                    continue
+                for task in done:
+                    model, status, text = task.result()
+                    if status == 200 and text:
+                        self.breaker.success(model)
+                        result = {"ok": True, "model": model, "text": text}
+                        self.cache.set(key, result)
+                        return result
+                    if status in RETRYABLE:
+                        self.breaker.failure(model)
+                    rate_limited = rate_limited or status == 429
+                    budget += 1
+        finally:
+            for task in pending:
+                task.cancel()
+        if rate_limited:
+            return {"ok": False, "error": "Rate limited, please retry."}
+        return {"ok": False, "error": "No model responded. Try again."}
+
+    def stats(self) -> Dict[str, Any]:
+        return {"cache": self.cache.stats(), "breaker": self.breaker.stats()}
@@ -1,13 +1,162 @@
+import asyncio
 import os
-from supabase import create_client, Client
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Dict, Tuple
+
+from .config import env_float, env_int
+from .metrics import record_supabase
+
+if TYPE_CHECKING:
+    import httpx
+    from supabase import Client, AsyncClient
 
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY", "")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
 
-def get_client() -> Client:
-    return create_client(SUPABASE_URL, SUPABASE_ANON_KEY)
+def pool_limits() -> "httpx.Limits":
+    import httpx
+    return httpx.Limits(
+        max_connections=env_int("SUPABASE_POOL_MAX", 20),
+        max_keepalive_connections=env_int("SUPABASE_POOL_KEEPALIVE", 10),
+        keepalive_expiry=env_float("SUPABASE_POOL_KEEPALIVE_EXPIRY", 30.0),
+    )
+
+def pool_timeout() -> "httpx.Timeout":
+    import httpx
+    return httpx.Timeout(env_float("SUPABASE_TIMEOUT", 10.0), connect=env_float("SUPABASE_CONNECT_TIMEOUT", 5.0))
+
+def timing_hooks(stats: Dict[str, int]):
+    def count_request(request):
+        stats["requests"] += 1
+        request.extensions["started"] = time.perf_counter()
+
+    def time_response(response):
+        request = response.request
+        started = request.extensions.get("started")
+        if started is not None:
+            record_supabase(request.url.path, request.method, response.status_code, time.perf_counter() - started)
+
+    return count_request, time_response
+
+class ClientManager:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools: Dict[str, Tuple["Client", "httpx.Client", Tuple[str, str]]] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _build(self, role: str, url: str, key: str) -> Tuple["Client", "httpx.Client"]:
+        import httpx
+        from supabase import create_client, ClientOptions
+        stats = self._stats.setdefault(role, {"created": 0, "reused": 0, "requests": 0})
+        count_request, time_response = timing_hooks(stats)
+        http = httpx.Client(limits=pool_limits(), timeout=pool_timeout(), event_hooks={"request": [count_request], "response": [time_response]})
+        sb = create_client(url, key, options=ClientOptions(httpx_client=http, postgrest_client_timeout=pool_timeout()))
+        stats["created"] += 1
+        return sb, http
+
+    def get(self, role: str, url: str, key: str) -> "Client":
+        pool = self._pools.get(role)
+        if pool and pool[2] == (url, key):
+            self._stats[role]["reused"] += 1
+            return pool[0]
+        with self._lock:
+            pool = self._pools.get(role)
+            if pool and pool[2] == (url, key):
+                self._stats[role]["reused"] += 1
+                return pool[0]
+            if pool:
+                pool[1].close()
+            sb, http = self._build(role, url, key)
+            self._pools[role] = (sb, http, (url, key))
+            return sb
+
+    def close(self):
+        with self._lock:
+            for _, http, _ in self._pools.values():
+                http.close()
+            self._pools = {}
+
+    def stats(self) -> Dict[str, Any]:
+        out = {}
+        for role, st in self._stats.items():
+            pool = self._pools.get(role)
+            conns = []
+            if pool:
+                conns = getattr(getattr(pool[1]._transport, "_pool", None), "connections", []) or []
+            out[role] = dict(st, connections=len(conns), idle=sum(1 for c in conns if c.is_idle()))
+        return out
+
+class AsyncClientManager:
+    def __init__(self):
+        self._pools: Dict[str, Tuple["AsyncClient", "httpx.AsyncClient", Tuple[str, str], Any]] = {}
+        self._building: Dict[str, "asyncio.Future"] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    async def _build(self, role: str, url: str, key: str, loop) -> "AsyncClient":
+        import httpx
+        from supabase import acreate_client, AsyncClientOptions
+        stats = self._stats.setdefault(role, {"created": 0, "reused": 0, "requests": 0})
+        count_request, time_response = timing_hooks(stats)
 
-def get_admin_client() -> Client:
+        async def on_request(request):
+            count_request(request)
+
+        async def on_response(response):
+            time_response(response)
+
+        old = self._pools.pop(role, None)
+        if old is not None:
+            try:
+                await old[1].aclose()
+            except Exception:
+                pass
+        http = httpx.AsyncClient(limits=pool_limits(), timeout=pool_timeout(), event_hooks={"request": [on_request], "response": [on_response]})
+        sb = await acreate_client(url, key, options=AsyncClientOptions(httpx_client=http, postgrest_client_timeout=pool_timeout()))
+        self._pools[role] = (sb, http, (url, key), loop)
+        stats["created"] += 1
+        return sb
+
+    async def get(self, role: str, url: str, key: str) -> "AsyncClient":
+        loop = asyncio.get_running_loop()
+        pool = self._pools.get(role)
+        if pool and pool[2] == (url, key) and pool[3] is loop:
+            self._stats[role]["reused"] += 1
+            return pool[0]
+        building = self._building.get(role)
+        if building is None or building.get_loop() is not loop:
+            building = self._building[role] = asyncio.ensure_future(self._build(role, url, key, loop))
+            building.add_done_callback(lambda f, role=role: self._building.pop(role, None) if self._building.get(role) is f else None)
+        return await asyncio.shield(building)
+
+    async def close(self):
+        pools, self._pools = self._pools, {}
+        for _, http, _, _ in pools.values():
+            try:
+                await http.aclose()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {role: dict(st) for role, st in self._stats.items()}
+
+clients = ClientManager()
+async_clients = AsyncClientManager()
+
+def get_client() -> "Client":
+    return clients.get("anon", SUPABASE_URL, SUPABASE_ANON_KEY)
+
+def get_admin_client() -> "Client":
+    key = SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY
+    return clients.get("service", SUPABASE_URL, key)
+
+async def get_async_client() -> "AsyncClient":
+    return await async_clients.get("anon", SUPABASE_URL, SUPABASE_ANON_KEY)
+
+async def get_async_admin_client() -> "AsyncClient":
     key = SUPABASE_SERVICE_ROLE_KEY or SUPABASE_ANON_KEY
-    return create_client(SUPABASE_URL, key)
+    return await async_clients.get("service", SUPABASE_URL, key)
+
+def client_stats() -> Dict[str, Any]:
+    return {"sync": clients.stats(), "async": async_clients.stats()}
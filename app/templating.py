@@ -0,0 +1,67 @@
+import hashlib
+import os
+import tempfile
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.templating import Jinja2Templates
+from starlette.types import Scope
+
+TEMPLATE_DIR = "app/templates"
+STATIC_DIR = "app/static"
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+def bytecode_cache() -> Optional[FileSystemBytecodeCache]:
+    path = os.getenv("TEMPLATE_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "leftoverchef-jinja")
+    try:
+        os.makedirs(path, exist_ok=True)
+    except OSError:
+        return None
+    return FileSystemBytecodeCache(path)
+
+def build_templates(directory: str = TEMPLATE_DIR) -> Jinja2Templates:
+    env = Environment(
+        loader=FileSystemLoader(directory),
+        autoescape=True,
+        bytecode_cache=bytecode_cache(),
+        auto_reload=os.getenv("TEMPLATE_RELOAD", "false").lower() == "true",
+    )
+    return Jinja2Templates(env=env)
+
+def precompile(templates: Jinja2Templates) -> int:
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
+
+class HashedStaticFiles(StaticFiles):
+    def __init__(self, directory: str = STATIC_DIR, prefix: str = "/static", **kwargs):
+        super().__init__(directory=directory, **kwargs)
+        self.root = directory
+        self.prefix = prefix
+        self.hashes: Dict[str, str] = {}
+
+    def digest(self, name: str) -> str:
+        h = self.hashes.get(name)
+        if h is None:
+            try:
+                with open(os.path.join(self.root, name), "rb") as f:
+                    h = hashlib.sha1(f.read()).hexdigest()[:12]
+            except OSError:
+                h = ""
+            self.hashes[name] = h
+        return h
+
+    def url(self, name: str) -> str:
+        h = self.digest(name)
+        return f"{self.prefix}/{name}?v={h}" if h else f"{self.prefix}/{name}"
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            v = parse_qs(scope.get("query_string", b"").decode("latin-1")).get("v", [""])[0]
+            response.headers["Cache-Control"] = IMMUTABLE if v and v == self.digest(path) else "no-cache"
+        return response
@@ -0,0 +1,57 @@
+import random
+from typing import Any, Dict, List, Tuple
+
+BASE_INGREDIENTS = [
+    "egg", "eggs", "tomato", "tomatoes", "rice", "bread", "garlic", "pasta", "onion", "red onion",
+    "cheese", "bell pepper", "cucumber", "basil", "olive oil", "vinegar", "carrot", "peas", "soy sauce",
+    "spring onion", "lettuce", "pepper", "herbs", "parsley", "chili flakes", "butter", "milk", "flour",
+    "potato", "spinach", "mushroom", "chicken", "beef", "tofu", "lemon", "ginger", "yogurt", "beans",
+    "lentils", "corn", "zucchini", "eggplant", "apple", "banana", "oats", "honey", "cream", "bacon",
+]
+
+def vocabulary(size: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    words = list(BASE_INGREDIENTS)
+    adjectives = ["fresh", "dried", "smoked", "baby", "wild", "roasted", "pickled", "green", "sweet", "hot"]
+    while len(words) < size:
+        w = f"{rng.choice(adjectives)} {rng.choice(BASE_INGREDIENTS)}"
+        if w not in words:
+            words.append(w)
+        elif len(words) >= len(BASE_INGREDIENTS) * (len(adjectives) + 1):
+            words.append(f"ingredient {len(words)}")
+    return words[:size]
+
+def zipf_weights(n: int, s: float = 1.1) -> List[float]:
+    return [1.0 / (i + 1) ** s for i in range(n)]
+
+def generate(recipes: int, vocab_size: int = 2000, min_ing: int = 3, max_ing: int = 12, seed: int = 0) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], List[str]]:
+    rng = random.Random(seed)
+    vocab = vocabulary(vocab_size, seed)
+    weights = zipf_weights(len(vocab))
+    rows = []
+    links = []
+    for i in range(recipes):
+        rid = f"r{i:06d}"
+        names = set()
+        target = rng.randint(min_ing, max_ing)
+        while len(names) < target:
+            names.update(rng.choices(vocab, weights=weights, k=target - len(names)))
+        rows.append({
+            "id": rid,
+            "title": f"Recipe {i}",
+            "minutes": rng.choice([10, 15, 20, 25, 30, 45, 60]),
+            "directions": ". ".join(f"Step {j + 1} for recipe {i}" for j in range(rng.randint(3, 8))) + ".",
+            "tags": rng.sample(["quick", "salad", "pasta", "rice", "breakfast", "zero-waste", "soup"], 2),
+        })
+        for n in sorted(names):
+            links.append({"id": f"{rid}-{len(links)}", "recipe_id": rid, "name": n})
+    return rows, links, vocab
+
+def pantries(vocab: List[str], count: int, min_size: int = 2, max_size: int = 12, seed: int = 1) -> List[List[Tuple[str, str]]]:
+    rng = random.Random(seed)
+    weights = zipf_weights(len(vocab))
+    out = []
+    for _ in range(count):
+        names = set(rng.choices(vocab, weights=weights, k=rng.randint(min_size, max_size)))
+        out.append([(n, rng.choice(["", "2030-01-01", "2000-01-01"])) for n in sorted(names)])
+    return out
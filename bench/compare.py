@@ -0,0 +1,37 @@
+import argparse
+import json
+import sys
+from typing import List
+
+METRICS = ["p50_ms", "p95_ms", "p99_ms", "throughput_rps"]
+
+def load(path: str):
+    with open(path) as f:
+        return json.load(f)
+
+def main(argv: List[str] = None) -> int:
+    p = argparse.ArgumentParser(description="Compare two benchmark JSON reports.")
+    p.add_argument("base")
+    p.add_argument("head")
+    args = p.parse_args(argv)
+    base, head = load(args.base), load(args.head)
+    base_runs = {r["recipes"]: r for r in base.get("runs", [])}
+    print(f"base {base.get('commit') or args.base}  head {head.get('commit') or args.head}")
+    for run in head.get("runs", []):
+        before = base_runs.get(run["recipes"])
+        if not before:
+            continue
+        for name, stats in run["endpoints"].items():
+            old = before["endpoints"].get(name)
+            if not old:
+                continue
+            cells = []
+            for m in METRICS:
+                a, b = old.get(m, 0.0), stats.get(m, 0.0)
+                change = (b - a) / a * 100.0 if a else 0.0
+                cells.append(f"{m} {a:.2f} -> {b:.2f} ({change:+.1f}%)")
+            print(f"{run['recipes']:>7} {name:<18} " + "  ".join(cells))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
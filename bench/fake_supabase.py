@@ -0,0 +1,223 @@
+import asyncio
+import bisect
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+class FakeResponse:
+    def __init__(self, data: Any):
+        self.data = data
+
+class FakeQuery:
+    def __init__(self, backend: "FakeSupabase", table: str):
+        self.backend = backend
+        self.table = table
+        self.op = "select"
+        self.columns: Optional[List[str]] = None
+        self.filters: List[Tuple[str, str, Any]] = []
+        self.payload: List[Dict[str, Any]] = []
+        self.bounds = None
+        self.ordering: Optional[Tuple[str, bool]] = None
+        self.one = False
+        self.on_conflict = ""
+
+    def select(self, columns: str = "*", **kwargs):
+        if self.op == "select":
+            self.columns = None if columns.strip() == "*" else [c.strip() for c in columns.split(",")]
+        return self
+
+    def insert(self, rows, **kwargs):
+        self.op = "insert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict: str = "", **kwargs):
+        self.op = "upsert"
+        self.on_conflict = on_conflict
+        self.payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def delete(self):
+        self.op = "delete"
+        return self
+
+    def eq(self, column: str, value: Any):
+        self.filters.append(("in", column, {value}))
+        return self
+
+    def neq(self, column: str, value: Any):
+        self.filters.append(("neq", column, value))
+        return self
+
+    def gt(self, column: str, value: Any):
+        self.filters.append(("gt", column, value))
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self.ordering = (column, desc)
+        return self
+
+    def in_(self, column: str, values):
+        self.filters.append(("in", column, set(values)))
+        return self
+
+    def _match(self, row: Dict[str, Any]) -> bool:
+        for kind, column, value in self.filters:
+            if kind == "in" and row.get(column) not in value:
+                return False
+            if kind == "neq" and row.get(column) == value:
+                return False
+            if kind == "gt" and (row.get(column) is None or not row.get(column) > value):
+                return False
+        return True
+
+    def _candidates(self, rows: List[Dict[str, Any]]) -> Iterable[Dict[str, Any]]:
+        if self.ordering is not None:
+            column, desc = self.ordering
+            keys, ordered = self.backend.sorted_rows(self.table, column)
+            if desc:
+                return reversed(ordered)
+            after = next((f[2] for f in self.filters if f[0] == "gt" and f[1] == column), None)
+            start = bisect.bisect_right(keys, after) if after is not None else 0
+            return (ordered[i] for i in range(start, len(ordered)))
+        lookup = next((f for f in self.filters if f[0] == "in"), None)
+        if lookup is None:
+            return rows
+        index = self.backend.index(self.table, lookup[1])
+        found = []
+        for value in lookup[2]:
+            found.extend(index.get(value, ()))
+        found.sort(key=lambda r: self.backend.order[id(r)])
+        return found
+
+    def range(self, start: int, end: int):
+        self.bounds = (start, end)
+        return self
+
+    def limit(self, n: int):
+        self.bounds = (0, n - 1)
+        return self
+
+    def single(self):
+        self.one = True
+        return self
+
+    def _project(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        if self.columns is None:
+            return dict(row)
+        return {c: row.get(c) for c in self.columns}
+
+    def execute(self) -> FakeResponse:
+        time.sleep(self.backend.delay(self.table, self.op))
+        return self.run()
+
+    def run(self) -> FakeResponse:
+        with self.backend.lock:
+            rows = self.backend.tables.setdefault(self.table, [])
+            if self.op in ("insert", "upsert"):
+                self.backend.sorted.pop(self.table, None)
+                out = []
+                keys = [k for k in self.on_conflict.split(",") if k]
+                lookup = self.backend.index(self.table, keys[0]) if self.op == "upsert" and keys else None
+                for r in self.payload:
+                    r = dict(r)
+                    if lookup is not None:
+                        match = next((x for x in lookup.get(r.get(keys[0]), ()) if all(x.get(k) == r.get(k) for k in keys)), None)
+                        if match is not None:
+                            r.pop("id", None)
+                            match.update(r)
+                            out.append(dict(match))
+                            continue
+                    r.setdefault("id", str(uuid.uuid4()))
+                    self.backend.order[id(r)] = len(self.backend.order)
+                    rows.append(r)
+                    for column, idx in self.backend.indexes.get(self.table, {}).items():
+                        idx.setdefault(r.get(column), []).append(r)
+                    out.append(dict(r))
+                return FakeResponse(out)
+            hit = []
+            skip, stop = self.bounds if self.bounds and self.op != "delete" else (0, None)
+            found = self._candidates(rows)
+            if skip and not self.filters and self.ordering is None:
+                found, skip = found[skip:stop + 1], 0
+            for r in found:
+                if not self._match(r):
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                hit.append(r)
+                if stop is not None and len(hit) > stop - self.bounds[0]:
+                    break
+            if self.op == "delete":
+                self.backend.indexes.pop(self.table, None)
+                self.backend.sorted.pop(self.table, None)
+                gone = {id(r) for r in hit}
+                self.backend.tables[self.table] = [r for r in rows if id(r) not in gone]
+                return FakeResponse(hit)
+            data = [self._project(r) for r in hit]
+            if self.one:
+                if len(data) != 1:
+                    raise LookupError(f"expected one row from {self.table}, got {len(data)}")
+                return FakeResponse(data[0])
+            return FakeResponse(data)
+
+class FakeSupabase:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        self.calls: Dict[str, int] = {}
+        self.indexes: Dict[str, Dict[str, Dict[Any, List[Dict[str, Any]]]]] = {}
+        self.order: Dict[int, int] = {}
+        self.sorted: Dict[str, Dict[str, Tuple[List[Any], List[Dict[str, Any]]]]] = {}
+        self.lock = threading.RLock()
+        self._rng = random.Random(seed)
+
+    def delay(self, table: str, op: str) -> float:
+        key = f"{table}.{op}"
+        with self.lock:
+            self.calls[key] = self.calls.get(key, 0) + 1
+            delay = self.latency_ms + (self._rng.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        return max(delay, 0.0) / 1000.0
+
+    def index(self, table: str, column: str) -> Dict[Any, List[Dict[str, Any]]]:
+        by_column = self.indexes.setdefault(table, {})
+        if column not in by_column:
+            idx: Dict[Any, List[Dict[str, Any]]] = {}
+            for r in self.tables.get(table, []):
+                idx.setdefault(r.get(column), []).append(r)
+            by_column[column] = idx
+        return by_column[column]
+
+    def sorted_rows(self, table: str, column: str) -> Tuple[List[Any], List[Dict[str, Any]]]:
+        by_column = self.sorted.setdefault(table, {})
+        if column not in by_column:
+            ordered = sorted((r for r in self.tables.get(table, []) if r.get(column) is not None), key=lambda r: r[column])
+            by_column[column] = ([r[column] for r in ordered], ordered)
+        return by_column[column]
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def load(self, table: str, rows: List[Dict[str, Any]]):
+        with self.lock:
+            self.tables[table] = [dict(r) for r in rows]
+            for r in self.tables[table]:
+                self.order[id(r)] = len(self.order)
+            self.indexes.pop(table, None)
+            self.sorted.pop(table, None)
+
+class AsyncFakeQuery(FakeQuery):
+    async def execute(self) -> FakeResponse:
+        await asyncio.sleep(self.backend.delay(self.table, self.op))
+        return self.run()
+
+class AsyncFakeSupabase:
+    def __init__(self, backend: FakeSupabase):
+        self.backend = backend
+
+    def table(self, name: str) -> AsyncFakeQuery:
+        return AsyncFakeQuery(self.backend, name)
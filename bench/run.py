@@ -0,0 +1,161 @@
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+
+from .catalog import generate, pantries
+from .fake_supabase import AsyncFakeSupabase, FakeSupabase
+
+ENDPOINTS = ["index", "plan", "recipe", "shopping", "shopping_pdf", "shopping_combined"]
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    ms = [x * 1000.0 for x in latencies]
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "throughput_rps": round(len(ms) / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 0.50), 3),
+        "p95_ms": round(percentile(ms, 0.95), 3),
+        "p99_ms": round(percentile(ms, 0.99), 3),
+        "max_ms": round(max(ms), 3) if ms else 0.0,
+    }
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return ""
+
+def setup_app(backend: FakeSupabase):
+    os.environ.setdefault("SUPABASE_URL", "http://fake.supabase.local")
+    os.environ.setdefault("SUPABASE_ANON_KEY", "bench-anon")
+    os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "bench-service")
+    from app import main
+    async_backend = AsyncFakeSupabase(backend)
+
+    async def get_async_client():
+        return async_backend
+
+    main.get_client = lambda: backend
+    main.get_admin_client = lambda: backend
+    main.get_async_client = get_async_client
+    return main
+
+def build_requests(name: str, recipe_ids: List[str], baskets: List[List[Tuple[str, str]]], rng: random.Random) -> Callable[[], Tuple[str, str, Dict[str, Any]]]:
+    def make():
+        if name == "index":
+            return "GET", "/", {}
+        if name == "plan":
+            basket = rng.choice(baskets)
+            return "POST", "/plan", {"data": {"ingredient": [n for n, _ in basket], "expiry": [e for _, e in basket]}}
+        rid = rng.choice(recipe_ids)
+        if name == "recipe":
+            return "GET", f"/recipe/{rid}", {}
+        if name == "shopping":
+            return "GET", f"/recipe/{rid}/shopping", {"params": {"format": "txt"}}
+        if name == "shopping_pdf":
+            return "GET", f"/recipe/{rid}/shopping", {"params": {"format": "pdf"}}
+        return "GET", "/shopping", {"params": {"rid": rng.sample(recipe_ids, min(5, len(recipe_ids))), "format": "txt"}}
+    return make
+
+async def drive(app, make: Callable[[], Tuple[str, str, Dict[str, Any]]], requests: int, concurrency: int) -> Dict[str, Any]:
+    import httpx
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            while remaining > 0:
+                remaining -= 1
+                method, path, kwargs = make()
+                t0 = time.perf_counter()
+                try:
+                    r = await client.request(method, path, **kwargs)
+                    ok = r.status_code < 400
+                except Exception:
+                    ok = False
+                latencies.append(time.perf_counter() - t0)
+                if not ok:
+                    errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - t0)
+
+def main(argv: List[str] = None) -> int:
+    p = argparse.ArgumentParser(description="Load and latency benchmarks against a fake Supabase backend.")
+    p.add_argument("--recipes", type=int, nargs="+", default=[1000], help="catalog sizes to benchmark (1k-100k)")
+    p.add_argument("--vocab", type=int, default=2000)
+    p.add_argument("--latency-ms", type=float, default=0.0, help="injected latency per Supabase call")
+    p.add_argument("--jitter-ms", type=float, default=0.0)
+    p.add_argument("--requests", type=int, default=200)
+    p.add_argument("--warmup", type=int, default=20)
+    p.add_argument("--concurrency", type=int, default=8)
+    p.add_argument("--endpoints", nargs="+", default=ENDPOINTS, choices=ENDPOINTS)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", default="", help="JSON output path (default bench/results/<commit>.json)")
+    args = p.parse_args(argv)
+
+    backend = FakeSupabase(args.latency_ms, args.jitter_ms, args.seed)
+    main_mod = setup_app(backend)
+    report: Dict[str, Any] = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k != "out"},
+        "runs": [],
+    }
+    for size in args.recipes:
+        recipes, links, vocab = generate(size, args.vocab, seed=args.seed)
+        backend.load("recipes", recipes)
+        backend.load("recipe_ingredients", links)
+        backend.load("events", [])
+        backend.load("ingredients_submissions", [])
+        main_mod.recipe_index.invalidate()
+        main_mod.recipe_cache.clear()
+        main_mod.pdf_cache.clear()
+        baskets = pantries(vocab, 500, seed=args.seed + 1)
+        ids = [r["id"] for r in recipes]
+        run = {"recipes": size, "ingredient_rows": len(links), "endpoints": {}}
+        for i, name in enumerate(args.endpoints):
+            backend.calls.clear()
+            main_mod.recipe_cache.clear()
+            main_mod.pdf_cache.clear()
+            make = build_requests(name, ids, baskets, random.Random(args.seed * 1000 + i + 2))
+            if args.warmup:
+                asyncio.run(drive(main_mod.app, make, args.warmup, args.concurrency))
+                backend.calls.clear()
+            stats = asyncio.run(drive(main_mod.app, make, args.requests, args.concurrency))
+            stats["supabase_calls"] = dict(backend.calls)
+            run["endpoints"][name] = stats
+            print(f"{size:>7} {name:<18} p50 {stats['p50_ms']:>9.2f} ms  p95 {stats['p95_ms']:>9.2f} ms  p99 {stats['p99_ms']:>9.2f} ms  {stats['throughput_rps']:>8.1f} rps  errors {stats['errors']}", file=sys.stderr)
+        report["runs"].append(run)
+    out = args.out or os.path.join("bench", "results", f"{report['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(out)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())